@@ -1,16 +1,35 @@
 from flask import Flask, request, jsonify
-import pickle
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 import pandas as pd
 from functools import wraps
 import os
+import logging
+from model_registry import ModelRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Load the trained model (you'll need to train and save this first)
-# model = pickle.load(open('model.pkl', 'rb'))
-# scaler = pickle.load(open('scaler.pkl', 'rb'))
+# Models written by ModelTrainer.save_model, served from a warm LRU cache
+registry = ModelRegistry(
+    model_path=os.getenv('MODEL_PATH', 'models/'),
+    max_models=int(os.getenv('MODEL_CACHE_SIZE', 8)),
+    memory_budget_mb=float(os.getenv('MODEL_MEMORY_BUDGET_MB', 1024)),
+    reload_interval=float(os.getenv('MODEL_RELOAD_INTERVAL', 5))
+)
+
+# Model name (in model_metadata.json) behind each endpoint
+PREDICT_MODEL = os.getenv('PREDICT_MODEL', 'best_model')
+CREDIT_MODEL = os.getenv('CREDIT_MODEL', 'credit_model')
+RISK_MODEL = os.getenv('RISK_MODEL', 'risk_model')
+registry.warm([PREDICT_MODEL, CREDIT_MODEL, RISK_MODEL])
+
+# Rows scored per scaler/model call in batch predictions
+PREDICT_CHUNK_ROWS = int(os.getenv('PREDICT_CHUNK_ROWS', 8192))
+
+# Credit scores are reported on the 300-900 bureau scale
+CREDIT_SCORE_MIN, CREDIT_SCORE_MAX = 300, 900
 
 API_TOKEN = os.getenv('API_TOKEN', 'trustvault-ml-token')
 
@@ -27,32 +46,89 @@ def require_auth(f):
 def home():
     return "ML Service is running!"
 
+class ModelUnavailable(Exception):
+    """Raised when the model behind an endpoint has not been trained or saved"""
+
+def _predict_matrix(model_data, features):
+    """
+    Scale and score a 2-D feature matrix with one scaler transform and one
+    predict_proba call per chunk, so memory stays bounded on large inputs
+    """
+    scaler = model_data.get('scaler')
+    model = model_data['model']
+    
+    # Impute missing inputs with the fill values saved at training time
+    fill = model_data.get('feature_fill')
+    if fill is not None and len(fill) == features.shape[1]:
+        missing = np.isnan(features)
+        if missing.any():
+            features = np.where(missing, fill, features)
+    has_proba = hasattr(model, 'predict_proba')
+    
+    predictions, probabilities = [], []
+    for start in range(0, max(len(features), 1), PREDICT_CHUNK_ROWS):
+        chunk = features[start:start + PREDICT_CHUNK_ROWS]
+        if scaler is not None:
+            if hasattr(scaler, 'feature_names_in_'):
+                chunk = pd.DataFrame(chunk, columns=scaler.feature_names_in_)
+            chunk = scaler.transform(chunk)
+        if has_proba:
+            # predict() is argmax over predict_proba; derive it instead of a second pass
+            proba = model.predict_proba(chunk)
+            predictions.append(model.classes_.take(np.argmax(proba, axis=1)))
+            probabilities.append(proba)
+        else:
+            predictions.append(model.predict(chunk))
+    
+    return np.concatenate(predictions), (np.concatenate(probabilities) if has_proba else None)
+
+def _run_model(name, data):
+    """Scale the request's feature vector or matrix and run the named model"""
+    model_data = registry.get(name)
+    if model_data is None:
+        raise ModelUnavailable(f"Model '{name}' is not available")
+    
+    features = np.asarray(data['features'], dtype=np.float64)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    prediction, probability = _predict_matrix(model_data, features)
+    return model_data, prediction, probability
+
+def _decode_labels(model_data, prediction):
+    """Map encoded classes back to the labels they were trained on"""
+    encoder = model_data.get('label_encoder')
+    if encoder is not None and hasattr(encoder, 'classes_'):
+        return encoder.inverse_transform(prediction)
+    return prediction
+
+def _json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         # Get JSON data from request
         data = request.get_json()
         
-        # Convert to DataFrame or numpy array as needed
-        features = np.array(data['features']).reshape(1, -1)
-        
-        # Scale features if scaler is available
-        # features_scaled = scaler.transform(features)
+        model_data, prediction, probability = _run_model(PREDICT_MODEL, data)
+        prediction = _decode_labels(model_data, prediction)
         
-        # Make prediction
-        # prediction = model.predict(features_scaled)
-        # probability = model.predict_proba(features_scaled)
-        
-        # Mock prediction for now
-        prediction = [1]
-        probability = [[0.3, 0.7]]
+        # A 2-D features matrix is scored as one batch and answered with arrays
+        if np.ndim(data['features']) == 2:
+            return jsonify({
+                'predictions': prediction.tolist(),
+                'probabilities': probability[:, -1].tolist() if probability is not None else None,
+                'status': 'success'
+            })
         
         return jsonify({
-            'prediction': prediction[0],
-            'probability': probability[0][1],
+            'prediction': _json_value(prediction[0]),
+            'probability': float(probability[0][-1]) if probability is not None else None,
             'status': 'success'
         })
         
+    except ModelUnavailable as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 503
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -63,18 +139,29 @@ def predict():
 def health_check():
     return jsonify({'status': 'healthy'})
 
+@app.route('/models', methods=['GET'])
+@require_auth
+def list_models():
+    return jsonify({'models': registry.status(), 'status': 'success'})
+
 @app.route('/credit-score', methods=['POST'])
 @require_auth
 def credit_score():
     try:
         data = request.get_json()
-        # features = np.array(data['features']).reshape(1, -1)
-        # prediction = credit_model.predict(features)
-        # For demo, return mock score
+        model_data, prediction, probability = _run_model(CREDIT_MODEL, data)
+        if probability is not None:
+            # Probability of the highest (most creditworthy) class on the bureau scale
+            score = CREDIT_SCORE_MIN + (CREDIT_SCORE_MAX - CREDIT_SCORE_MIN) * probability[0][-1]
+        else:
+            score = prediction[0]
         return jsonify({
-            'credit_score': 750,
+            'credit_score': int(round(float(score))),
             'status': 'success'
         })
+    except ModelUnavailable as e:
+        # A placeholder score could be mistaken for a real one
+        return jsonify({'error': str(e), 'status': 'error'}), 503
     except Exception as e:
         return jsonify({'error': str(e), 'status': 'error'}), 400
 
@@ -83,15 +170,31 @@ def credit_score():
 def risk_analysis():
     try:
         data = request.get_json()
-        # features = np.array(data['features']).reshape(1, -1)
-        # prediction = risk_model.predict(features)
-        # For demo, return mock risk
+        model_data, prediction, probability = _run_model(RISK_MODEL, data)
         return jsonify({
-            'risk_level': 'low',
+            'risk_level': _json_value(_decode_labels(model_data, prediction)[0]),
             'status': 'success'
         })
+    except ModelUnavailable as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 503
     except Exception as e:
         return jsonify({'error': str(e), 'status': 'error'}), 400
 
+def after_fork():
+    """
+    Set up a pre-fork server worker (see gunicorn.conf.py)
+
+    Models warmed in the parent are shared copy-on-write; the registry's
+    watcher thread is not inherited and is started again here.
+    """
+    registry.after_fork()
+
+def reload_models():
+    """Pick up newer artifacts in the pre-fork server's parent, before new workers fork"""
+    registry.refresh()
+    registry.warm([PREDICT_MODEL, CREDIT_MODEL, RISK_MODEL])
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Development server; see gunicorn.conf.py for production
+    port = int(os.getenv('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=os.getenv('DEBUG', 'False').lower() == 'true')
\ No newline at end of file
@@ -0,0 +1,122 @@
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests into a single model call
+
+    Requests are queued and a worker thread gathers them for up to
+    `window_ms` milliseconds (or until `max_batch_rows` rows are waiting),
+    scores the concatenated frame once and fans the per-request slices back
+    out to the waiting callers. The window is adaptive: a lone request with
+    nothing else queued, and no concurrent traffic in the previous batch, is
+    scored at once instead of waiting for company that isn't coming.
+    """
+
+    def __init__(self, score_fn, window_ms=2.0, max_batch_rows=1024):
+        """
+        Args:
+            score_fn (callable): Takes a DataFrame and returns a tuple of
+                row-aligned sequences (e.g. anomaly flags and scores)
+            window_ms (float): Maximum time to wait for more requests while
+                other requests are in flight
+            max_batch_rows (int): Flush as soon as this many rows are queued
+        """
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._start()
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._last_batch_size = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def after_fork(self):
+        """Restart the worker thread in a forked child, where it doesn't exist"""
+        self._start()
+
+    def submit(self, frame):
+        """
+        Queue a frame for scoring
+
+        Args:
+            frame (DataFrame or ndarray): Rows to score
+
+        Returns:
+            Future: Resolves to the score_fn results for this frame's rows
+        """
+        future = Future()
+        self._queue.put((frame, future))
+        return future
+
+    def score(self, frame, timeout=None):
+        """Queue a frame and block until its results are ready"""
+        return self.submit(frame).result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0][0])
+
+            # Take whatever queued up while the previous batch was scored
+            while rows < self.max_batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            # Only wait for more when requests are arriving concurrently
+            concurrent = len(batch) > 1 or self._last_batch_size > 1
+            deadline = time.monotonic() + (self.window if concurrent else 0)
+
+            while rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            self._last_batch_size = len(batch)
+            self._process(batch)
+
+    def _process(self, batch):
+        frames = [frame for frame, _ in batch]
+        try:
+            if len(frames) == 1:
+                combined = frames[0]
+            elif isinstance(frames[0], np.ndarray):
+                combined = np.concatenate(frames)
+            else:
+                combined = pd.concat(frames, ignore_index=True)
+            results = self.score_fn(combined)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad request (e.g. mismatched columns) must not fail the others
+            logger.warning(f"Batched scoring failed, retrying {len(batch)} requests individually: {e}")
+            for item in batch:
+                self._process([item])
+            return
+
+        offset = 0
+        for frame, future in batch:
+            size = len(frame)
+            future.set_result(tuple(result[offset:offset + size] for result in results))
+            offset += size
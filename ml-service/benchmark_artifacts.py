@@ -0,0 +1,75 @@
+"""
+Report size and load time of model artifacts
+
+Compares the single joblib pickle ModelTrainer used to write against the
+component artifact directory (uncompressed and compressed): bytes on disk,
+time to load everything, time to load only the scaler (lazy loading) and
+time to load the model, and checks that predictions are unchanged.
+
+Usage:
+    python benchmark_artifacts.py --estimators 200 --rows 20000
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import joblib
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+
+from model_artifacts import save_artifact, load_artifact, artifact_size
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--estimators', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--features', type=int, default=12)
+    parser.add_argument('--compress', type=int, default=3)
+    args = parser.parse_args()
+
+    X, y = make_classification(args.rows, args.features, random_state=42)
+    model = RandomForestClassifier(n_estimators=args.estimators, random_state=42).fit(X, y)
+    model_data = {
+        'model': model,
+        'scaler': StandardScaler().fit(X),
+        'label_encoder': LabelEncoder().fit(y),
+        'best_score': 0.0,
+        'timestamp': 'benchmark'
+    }
+    expected = model.predict_proba(X)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, 'model.pkl')
+        joblib.dump(model_data, pickle_path)
+        artifacts = {
+            'pickle': pickle_path,
+            'artifact': os.path.join(tmp, 'model.model'),
+            f'artifact z{args.compress}': os.path.join(tmp, 'model_z.model'),
+        }
+        save_artifact(model_data, artifacts['artifact'])
+        save_artifact(model_data, artifacts[f'artifact z{args.compress}'], compress=args.compress)
+
+        print(f"{'layout':<14} {'size MB':>9} {'full ms':>9} {'scaler ms':>10} {'model ms':>9} {'same':>6}")
+        for layout, path in artifacts.items():
+            if layout == 'pickle':
+                _, full_ms = _timed(lambda: joblib.load(path))
+                scaler_ms = model_ms = full_ms
+                loaded = joblib.load(path)['model']
+            else:
+                _, full_ms = _timed(lambda: dict(load_artifact(path).items()))
+                _, scaler_ms = _timed(lambda: load_artifact(path)['scaler'])
+                loaded, model_ms = _timed(lambda: load_artifact(path)['model'])
+            same = np.array_equal(loaded.predict_proba(X), expected)
+            print(f"{layout:<14} {artifact_size(path) / 2**20:>9.2f} {full_ms:>9.1f} "
+                  f"{scaler_ms:>10.1f} {model_ms:>9.1f} {str(same):>6}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+Benchmark latency and throughput of the ml-service endpoints
+
+Starts detector.py and app.py as local servers (each in its own temporary
+working directory) and drives /train, /detect and /predict with synthetic
+access-pattern features, at every combination of batch size (rows per
+request) and concurrency (client threads). Reports p50/p95/p99 latency,
+requests and rows per second, and the RSS and PSS of every server process:
+the server itself and any workers it forks (PSS splits pages shared
+copy-on-write between them). Clients run in this process, so on a small
+host they compete with the server for CPU.
+
+--server picks Flask's development server or the production gunicorn
+setup (gunicorn.conf.py) with --workers and --threads, to compare them.
+Under gunicorn, /train goes to the single-process full detector and
+/detect to a DETECTOR_ROLE=scoring server with --workers workers, which
+loads the models the full detector saves.
+
+/predict is served from a model trained on the same synthetic features with
+ModelTrainer. --detector-url/--ml-url benchmark servers that are already
+running instead; their memory can't be measured. --in-process times
+AnomalyDetector's methods directly, without HTTP.
+
+Usage:
+    python benchmark_endpoints.py --batch-sizes 1,100,1000 --concurrency 1,4,16
+    python benchmark_endpoints.py --payload npy --endpoints detect
+    python benchmark_endpoints.py --server gunicorn --workers 4 --threads 4
+    python benchmark_endpoints.py --in-process --batch-sizes 1,1000,100000
+"""
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_store import AccessFeatureStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+API_TOKEN = 'benchmark-token'
+FEATURE_NAMES = list(AccessFeatureStore.FEATURE_NAMES)
+
+def make_features(n_rows, rng, anomaly_rate=0.05):
+    """Per-entity access features with a share of bursty, off-hours entities"""
+    anomalous = rng.random(n_rows) < anomaly_rate
+    frame = pd.DataFrame({
+        'access_count': np.where(anomalous, rng.poisson(400, n_rows), rng.poisson(40, n_rows)),
+        'distinct_resources': np.where(anomalous, rng.poisson(120, n_rows), rng.poisson(8, n_rows)),
+        'off_hours_ratio': np.where(anomalous, rng.beta(5, 2, n_rows), rng.beta(1, 8, n_rows))
+    }, columns=FEATURE_NAMES).astype(np.float64)
+    return frame, anomalous.astype(int)
+
+def _encode(frame, payload):
+    """Request body and headers for a batch in the given payload format"""
+    if payload == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, frame.to_numpy(), allow_pickle=False)
+        return buffer.getvalue(), {'Content-Type': 'application/x-npy',
+                                   'X-Feature-Names': ','.join(frame.columns)}
+    if payload == 'columnar':
+        features = {name: frame[name].tolist() for name in frame.columns}
+    elif payload == 'matrix':
+        features = frame.to_numpy().tolist()
+    else:
+        features = frame.to_dict(orient='records')
+    return json.dumps({'features': features}).encode(), {'Content-Type': 'application/json'}
+
+# Server processes
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_until_listening(port, proc, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+def start_server(module, workdir, env, server='dev', workers=2, threads=4, name=None):
+    """Run module's Flask app on a free local port; returns (process, base_url)"""
+    port = _free_port()
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(HERE, 'gunicorn.conf.py'),
+                   '--bind', f'127.0.0.1:{port}', f'{module}:app']
+        env = {'WEB_CONCURRENCY': str(workers), 'GUNICORN_THREADS': str(threads), **env}
+    else:
+        command = [sys.executable, '-c',
+                   f"import {module}; {module}.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    log = open(os.path.join(workdir, f"{name or module}.log"), 'wb')
+    proc = subprocess.Popen(
+        command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+        env={**os.environ, 'PYTHONPATH': HERE, 'API_TOKEN': API_TOKEN, **env}
+    )
+    _wait_until_listening(port, proc)
+    return proc, f"http://127.0.0.1:{port}"
+
+def _children(pid):
+    children = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                # The command name may contain spaces; the ppid follows its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(name))
+    return children
+
+def _pss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def process_memory(pid):
+    """RSS, peak RSS and PSS in MB of pid and every process it forked (Linux only)"""
+    usage = {}
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        fields = {}
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith(('VmRSS:', 'VmHWM:')):
+                        fields[line.split(':')[0]] = int(line.split()[1]) / 1024
+        except OSError:
+            continue
+        usage[current] = {'rss_mb': round(fields.get('VmRSS', 0), 1),
+                          'peak_rss_mb': round(fields.get('VmHWM', 0), 1),
+                          'pss_mb': _pss_mb(current)}
+        pending.extend(_children(current))
+    return usage
+
+# Load generation
+
+def _summarize(latencies, errors, rows_per_request, elapsed):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (np.nan,) * 3
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'rows_per_second': round(len(latencies) * rows_per_request / elapsed, 1)
+    }
+
+def drive(base_url, path, bodies, rows_per_request, concurrency, n_requests, timeout=300):
+    """
+    Send n_requests POSTs (cycling through pre-encoded bodies) from
+    `concurrency` threads, each over its own keep-alive connection
+    """
+    url = urlsplit(base_url)
+    n_requests = max(n_requests, concurrency)
+    counter = iter(range(n_requests))
+    counter_lock = threading.Lock()
+    latencies, errors = [], []
+
+    def client():
+        conn = http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+        try:
+            while True:
+                with counter_lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                body, headers = bodies[i % len(bodies)]
+                start = time.perf_counter()
+                try:
+                    conn.request('POST', path, body=body,
+                                 headers={**headers, 'Authorization': f'Bearer {API_TOKEN}'})
+                    response = conn.getresponse()
+                    content = response.read()
+                    error = None if response.status < 300 else f"HTTP {response.status}: {content[:200]!r}"
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    error = repr(e)
+                elapsed = time.perf_counter() - start
+                if error is None:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(error)
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client) for _ in range(concurrency)]:
+            future.result()
+    stats = _summarize(latencies, len(errors), rows_per_request, time.perf_counter() - start)
+    if errors:
+        stats['first_error'] = errors[0]
+    return stats
+
+def _print_header():
+    print(f"{'endpoint':<10} {'batch':>7} {'conc':>5} {'reqs':>6} {'err':>4} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'rows/s':>11}")
+
+def _print_row(endpoint, batch, concurrency, stats):
+    print(f"{endpoint:<10} {batch:>7} {concurrency:>5} {stats['requests']:>6} {stats['errors']:>4} "
+          f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+          f"{stats['requests_per_second']:>9.1f} {stats['rows_per_second']:>11.1f}")
+
+def _print_memory(name, usage):
+    for pid, stats in usage.items():
+        pss = f", PSS {stats['pss_mb']:.1f} MB" if stats['pss_mb'] is not None else ""
+        print(f"  {name} pid {pid}: RSS {stats['rss_mb']:.1f} MB, peak {stats['peak_rss_mb']:.1f} MB{pss}")
+
+def _bodies(rng, batch, payload, n_distinct=4):
+    return [_encode(make_features(batch, rng)[0], payload) for _ in range(n_distinct)]
+
+def run_http(args, rng, workdir, results):
+    servers = {}
+    server = (args.server, args.workers, args.threads)
+    try:
+        detector_url, ml_url = args.detector_url, args.ml_url
+        scoring_url = detector_url
+        if not detector_url and ({'train', 'detect'} & args.endpoints):
+            os.makedirs(os.path.join(workdir, 'detector'))
+            # Scoring workers load a model the detector saved within a second
+            proc, detector_url = start_server('detector', os.path.join(workdir, 'detector'),
+                                              {'MODEL_RELOAD_INTERVAL': '1'}, *server)
+            servers['detector'] = proc
+            scoring_url = detector_url
+            if args.server == 'gunicorn' and 'detect' in args.endpoints:
+                proc, scoring_url = start_server('detector', os.path.join(workdir, 'detector'),
+                                                 {'MODEL_RELOAD_INTERVAL': '1', 'DETECTOR_ROLE': 'scoring'},
+                                                 *server, name='scoring')
+                servers['scoring'] = proc
+        if not ml_url and 'predict' in args.endpoints:
+            ml_url = _start_ml_service(args, rng, workdir, servers)
+
+        _print_header()
+        # Synchronous: waits for the swap, which also gives /detect a model to score with
+        train_path = '/train'
+        if 'train' in args.endpoints and detector_url:
+            for batch in args.train_sizes:
+                for concurrency in args.concurrency:
+                    bodies = _bodies(rng, batch, args.payload)
+                    stats = drive(detector_url, train_path, bodies, batch, concurrency, args.train_requests)
+                    results.append({'endpoint': 'train', 'batch': batch, 'concurrency': concurrency, **stats})
+                    _print_row('train', batch, concurrency, stats)
+        elif 'detector' in servers:
+            drive(detector_url, train_path, _bodies(rng, max(args.train_sizes), args.payload, 1),
+                  max(args.train_sizes), 1, 1)
+        if 'scoring' in servers:
+            # Let every scoring worker load the model the detector saved
+            time.sleep(2)
+        if 'detect' in args.endpoints and scoring_url:
+            for batch in args.batch_sizes:
+                bodies = _bodies(rng, batch, args.payload)
+                drive(scoring_url, '/detect', bodies, batch, 1, args.warmup)
+                for concurrency in args.concurrency:
+                    stats = drive(scoring_url, '/detect', bodies, batch, concurrency, args.requests)
+                    results.append({'endpoint': 'detect', 'batch': batch, 'concurrency': concurrency, **stats})
+                    _print_row('detect', batch, concurrency, stats)
+        if 'predict' in args.endpoints and ml_url:
+            for batch in args.batch_sizes:
+                # /predict takes a plain 2-D matrix in training column order
+                bodies = _bodies(rng, batch, 'matrix')
+                drive(ml_url, '/predict', bodies, batch, 1, args.warmup)
+                for concurrency in args.concurrency:
+                    stats = drive(ml_url, '/predict', bodies, batch, concurrency, args.requests)
+                    results.append({'endpoint': 'predict', 'batch': batch, 'concurrency': concurrency, **stats})
+                    _print_row('predict', batch, concurrency, stats)
+
+        memory = {}
+        for name, proc in servers.items():
+            memory[name] = process_memory(proc.pid)
+            _print_memory(name, memory[name])
+        return memory
+    finally:
+        for proc in servers.values():
+            proc.terminate()
+            proc.wait()
+
+def _start_ml_service(args, rng, workdir, servers):
+    """Train a /predict model on synthetic features, then start app.py serving it"""
+    from sklearn.model_selection import train_test_split
+    from training import ModelTrainer
+
+    ml_dir = os.path.join(workdir, 'ml')
+    os.makedirs(ml_dir)
+    frame, labels = make_features(args.train_rows, rng)
+    frame['is_anomaly'] = labels
+    frame.to_csv(os.path.join(ml_dir, 'training_data.csv'), index=False)
+    trainer = ModelTrainer(data_path=ml_dir, model_path=os.path.join(ml_dir, 'models'))
+    X, y = trainer.load_preprocessed('training_data.csv', 'is_anomaly', use_cache=False)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    # One candidate is enough for serving benchmarks and keeps setup quick
+    models = {'random_forest': trainer.candidate_models()['random_forest']}
+    trainer.train_models(X_train, y_train, X_test, y_test, n_jobs=1, models=models)
+    trainer.save_model()
+
+    proc, url = start_server('app', ml_dir, {'MODEL_PATH': os.path.join(ml_dir, 'models')},
+                             args.server, args.workers, args.threads)
+    servers['ml'] = proc
+    return url
+
+# In-process
+
+def _time_calls(fn, data, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(data)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_in_process(args, rng, workdir, results):
+    """Time AnomalyDetector's methods directly, without HTTP or batching"""
+    import logging
+    # Importing detector builds the Flask app and loads anomaly_model.pkl from the working directory
+    os.chdir(workdir)
+    from detector import AnomalyDetector
+    logging.getLogger().setLevel(logging.WARNING)
+
+    detector = AnomalyDetector()
+    _print_header()
+    for batch in args.train_sizes:
+        train_frame = make_features(batch, rng)[0]
+        latencies = _time_calls(detector.train, train_frame, args.train_requests)
+        stats = _summarize(latencies, 0, batch, sum(latencies))
+        results.append({'endpoint': 'train', 'batch': batch, 'concurrency': 1, **stats})
+        _print_row('train', batch, 1, stats)
+
+    methods = {
+        'detect': detector.detect_anomalies,
+        'scores': detector.get_anomaly_scores,
+        'score': detector.score
+    }
+    for batch in args.batch_sizes:
+        frame = make_features(batch, rng)[0]
+        repeats = max(3, min(args.requests, 10**6 // batch))
+        for name, method in methods.items():
+            method(frame)
+            latencies = _time_calls(method, frame, repeats)
+            stats = _summarize(latencies, 0, batch, sum(latencies))
+            results.append({'endpoint': name, 'batch': batch, 'concurrency': 1, **stats})
+            _print_row(name, batch, 1, stats)
+
+    memory = {'in_process': process_memory(os.getpid())}
+    _print_memory('in_process', memory['in_process'])
+    return memory
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', default='train,detect,predict',
+                        help='Comma-separated subset of train,detect,predict')
+    parser.add_argument('--batch-sizes', type=_int_list, default=[1, 100, 1000])
+    parser.add_argument('--concurrency', type=_int_list, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per batch size and concurrency')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--train-sizes', type=_int_list, default=[1000, 10000])
+    parser.add_argument('--train-requests', type=int, default=3)
+    parser.add_argument('--train-rows', type=int, default=5000, help='Rows of the /predict model')
+    parser.add_argument('--payload', choices=['rows', 'columnar', 'npy'], default='columnar',
+                        help='Body format for /train and /detect')
+    parser.add_argument('--server', choices=['dev', 'gunicorn'], default='dev',
+                        help="Flask's development server or the production gunicorn setup")
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker')
+    parser.add_argument('--detector-url', help='Benchmark a running detector.py instead of starting one')
+    parser.add_argument('--ml-url', help='Benchmark a running app.py instead of starting one')
+    parser.add_argument('--in-process', action='store_true', help='Time AnomalyDetector methods without HTTP')
+    parser.add_argument('--output', help='Also write the results as JSON here')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    args.endpoints = set(args.endpoints.split(','))
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as workdir:
+        try:
+            if args.in_process:
+                memory = run_in_process(args, rng, workdir, results)
+            else:
+                memory = run_http(args, rng, workdir, results)
+        finally:
+            os.chdir(cwd)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'mode': 'in_process' if args.in_process else args.server,
+                       'results': results, 'memory_mb': memory}, f, indent=2, default=str)
+
+if __name__ == '__main__':
+    main()
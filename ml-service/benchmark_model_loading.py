@@ -0,0 +1,96 @@
+"""
+Benchmark per-worker memory and cold-start time of anomaly model loading
+
+Compares loading the pickled IsolationForest with joblib (a private copy per
+worker) against mapping the flat forest artifact read-only (one copy shared
+through the page cache). Each worker is a separate process, like a gunicorn
+worker. PSS splits shared pages between the processes mapping them, so it
+shows the real per-worker cost.
+
+Usage:
+    python benchmark_model_loading.py --workers 4 --estimators 300
+"""
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+
+import numpy as np
+import joblib
+from sklearn.ensemble import IsolationForest
+
+from forest_scorer import CompiledIsolationForest
+
+def _memory_kb():
+    """Return (rss, pss) of the current process in kB (Linux only)"""
+    usage = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                usage[parts[0][:-1]] = int(parts[1])
+    return usage.get('Rss', 0), usage.get('Pss', 0)
+
+def _worker(mode, model_path, forest_path, rows, ready, results):
+    rss_before, _ = _memory_kb()
+    start = time.perf_counter()
+    if mode == 'joblib':
+        scorer = joblib.load(model_path)
+    else:
+        scorer = CompiledIsolationForest.load(forest_path, mmap_mode='r')
+    load_seconds = time.perf_counter() - start
+
+    # Touch every node the way serving traffic would
+    scorer.score_samples(rows)
+
+    # Measure only once every worker holds its model, so sharing is visible
+    ready.wait()
+    rss, pss = _memory_kb()
+    results.put((mode, load_seconds, rss - rss_before, pss))
+    ready.wait()
+
+def run(mode, workers, model_path, forest_path, rows):
+    ctx = mp.get_context('fork')
+    ready = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_worker, args=(mode, model_path, forest_path, rows, ready, results))
+        for _ in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    ready.wait()
+    measurements = [results.get() for _ in range(workers)]
+    ready.wait()
+    for p in processes:
+        p.join()
+    return measurements
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--estimators', type=int, default=300)
+    parser.add_argument('--max-samples', type=int, default=4096)
+    parser.add_argument('--features', type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(args.max_samples * 2, args.features))
+    model = IsolationForest(n_estimators=args.estimators, max_samples=args.max_samples,
+                            random_state=42).fit(X)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'anomaly_model.pkl')
+        forest_path = os.path.join(tmp, 'anomaly_model.forest')
+        joblib.dump(model, model_path)
+        CompiledIsolationForest(model).save(forest_path)
+        del model
+
+        print(f"{'mode':<8} {'load ms':>10} {'RSS delta MB':>14} {'PSS MB':>10}")
+        for mode in ('joblib', 'mmap'):
+            for _, load_seconds, rss_kb, pss_kb in run(mode, args.workers, model_path, forest_path, X[:256]):
+                print(f"{mode:<8} {load_seconds * 1000:>10.2f} {rss_kb / 1024:>14.1f} {pss_kb / 1024:>10.1f}")
+
+if __name__ == '__main__':
+    main()
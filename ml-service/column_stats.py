@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+class ColumnStatistics:
+    """
+    Missing-value fill statistics computed in a single scan
+
+    Numeric columns get their median or mean, categorical (object, string
+    or category) columns their mode. fit() computes exact values over an
+    in-memory frame. partial_fit() folds in chunks of a larger dataset:
+    means stay exact, medians come from a bounded uniform sample per column
+    and modes from the most frequent max_categories values kept after each
+    chunk. The result is a plain dict meant to be saved with the model.
+    """
+
+    def __init__(self, numeric_strategy='median', sample_size=100000, max_categories=10000,
+                 random_state=42):
+        """
+        Args:
+            numeric_strategy (str): 'median' or 'mean' for numeric columns
+            sample_size (int): Values kept per column for streaming medians
+            max_categories (int): Value counts kept per column for streaming modes
+            random_state (int): Seed for the streaming median sample
+        """
+        if numeric_strategy not in ('median', 'mean'):
+            raise ValueError(f"Unknown numeric strategy: {numeric_strategy}")
+        self.numeric_strategy = numeric_strategy
+        self.sample_size = sample_size
+        self.max_categories = max_categories
+        self._rng = np.random.default_rng(random_state)
+        self.fill_values = {}
+        self._sums = {}
+        self._counts = {}
+        self._samples = {}
+        self._value_counts = {}
+
+    @staticmethod
+    def _split(df):
+        numeric = list(df.select_dtypes(include=[np.number]).columns)
+        numeric_set = set(numeric)
+        categorical = [col for col in df.columns if col not in numeric_set
+                       and not pd.api.types.is_bool_dtype(df[col])]
+        return numeric, categorical
+
+    @staticmethod
+    def _mode(counts):
+        return counts.idxmax() if len(counts) else 'Unknown'
+
+    def fit(self, df):
+        """Compute exact fill values for every column of an in-memory frame"""
+        numeric, categorical = self._split(df)
+        if numeric:
+            values = df[numeric]
+            stats = values.median() if self.numeric_strategy == 'median' else values.mean()
+            self.fill_values = stats.to_dict()
+        else:
+            self.fill_values = {}
+        for col in categorical:
+            self.fill_values[col] = self._mode(df[col].value_counts(sort=False))
+        return self
+
+    def partial_fit(self, chunk):
+        """Fold one chunk of a streamed dataset into the running statistics"""
+        numeric, categorical = self._split(chunk)
+        for col in numeric:
+            values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            self._sums[col] = self._sums.get(col, 0.0) + values.sum()
+            self._counts[col] = self._counts.get(col, 0) + len(values)
+            if self.numeric_strategy == 'median':
+                self._sample(col, values)
+        for col in categorical:
+            counts = chunk[col].value_counts(sort=False)
+            counts.index = counts.index.astype(object)
+            previous = self._value_counts.get(col)
+            if previous is not None:
+                counts = previous.add(counts, fill_value=0)
+            if len(counts) > self.max_categories:
+                counts = counts.nlargest(self.max_categories)
+            self._value_counts[col] = counts
+        self.fill_values = self._finalize()
+        return self
+
+    def _sample(self, col, values):
+        # Bottom-k random keys: a uniform sample of the values seen so far
+        keys = self._rng.random(len(values))
+        sample, sample_keys = self._samples.get(col, (np.empty(0), np.empty(0)))
+        sample = np.concatenate([sample, values])
+        sample_keys = np.concatenate([sample_keys, keys])
+        if len(sample) > self.sample_size:
+            keep = np.argpartition(sample_keys, self.sample_size - 1)[:self.sample_size]
+            sample, sample_keys = sample[keep], sample_keys[keep]
+        self._samples[col] = (sample, sample_keys)
+
+    def _finalize(self):
+        fill_values = {}
+        for col, count in self._counts.items():
+            if not count:
+                fill_values[col] = np.nan
+            elif self.numeric_strategy == 'median':
+                fill_values[col] = float(np.median(self._samples[col][0]))
+            else:
+                fill_values[col] = float(self._sums[col] / count)
+        for col, counts in self._value_counts.items():
+            fill_values[col] = self._mode(counts)
+        return fill_values
+
+    def transform(self, df):
+        """Fill missing values in place with the fitted statistics"""
+        columns = [col for col in df.columns if col in self.fill_values]
+        for col in columns:
+            if df[col].isna().any():
+                value = self.fill_values[col]
+                if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories:
+                    df[col] = df[col].cat.add_categories([value])
+                df[col] = df[col].fillna(value)
+        return df
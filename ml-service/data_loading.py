@@ -0,0 +1,197 @@
+import time
+import logging
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class DatasetLoader:
+    """
+    Memory-conscious CSV loading for training extracts
+
+    A schema is inferred from a sample of the file: low-cardinality strings
+    become `category`, and after parsing integers are downcast to the
+    smallest type holding their values and floats to float32 wherever that
+    changes no value. Files are parsed chunk by chunk and each chunk is
+    downcast as it arrives, so the 64-bit parse of the whole file never sits
+    in memory. They can also be streamed in chunks or reduced to a uniform
+    reservoir sample. Every load records its parse time and memory footprint
+    in `last_load_stats`.
+    """
+
+    def __init__(self, sample_rows: int = 100000, category_ratio: float = 0.5,
+                 chunksize: int = 500000):
+        """
+        Args:
+            sample_rows (int): Rows read to infer the schema
+            category_ratio (float): A string column whose distinct/non-null
+                ratio in the sample is below this is read as `category`
+            chunksize (int): Rows per chunk when streaming
+        """
+        self.sample_rows = sample_rows
+        self.category_ratio = category_ratio
+        self.chunksize = chunksize
+        self.last_load_stats = None
+        self._default_row_bytes = 0.0
+
+    def infer_schema(self, path: str) -> Dict[str, str]:
+        """
+        Infer read dtypes from the first sample_rows rows
+
+        Numeric columns are left as 64-bit here and downcast after parsing,
+        since a sample cannot prove the range or precision of the whole file.
+        """
+        sample = pd.read_csv(path, nrows=self.sample_rows)
+        schema = {}
+        for col in sample.columns:
+            values = sample[col]
+            if pd.api.types.is_string_dtype(values) or pd.api.types.is_object_dtype(values):
+                non_null = values.count()
+                if non_null and values.nunique() / non_null < self.category_ratio:
+                    schema[col] = 'category'
+        # Per-row size with default dtypes, used to report the savings
+        self._default_row_bytes = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+        return schema
+
+    @staticmethod
+    def _downcast(frame: pd.DataFrame) -> pd.DataFrame:
+        for col in frame.select_dtypes(include=['integer']).columns:
+            frame[col] = pd.to_numeric(frame[col], downcast='integer')
+        for col in frame.select_dtypes(include=['float64']).columns:
+            values = frame[col].to_numpy()
+            compact = values.astype(np.float32)
+            # Only when every value survives the round trip
+            if np.array_equal(compact.astype(np.float64), values, equal_nan=True):
+                frame[col] = compact
+        return frame
+
+    def _record(self, frame: pd.DataFrame, rows_read: int, start: float, engine: str):
+        seconds = time.perf_counter() - start
+        memory = int(frame.memory_usage(deep=True, index=False).sum())
+        default_memory = int(self._default_row_bytes * len(frame))
+        self.last_load_stats = {
+            'rows_read': rows_read,
+            'rows': len(frame),
+            'engine': engine,
+            'seconds': seconds,
+            'memory_bytes': memory,
+            'default_memory_bytes': default_memory,
+            'memory_saved_bytes': default_memory - memory
+        }
+        logger.info(
+            f"Parsed {rows_read} rows in {seconds:.2f}s with {engine}: "
+            f"{memory / 2**20:.1f} MB in memory vs ~{default_memory / 2**20:.1f} MB with default dtypes"
+        )
+
+    def load(self, path: str, sample_size: Optional[int] = None,
+             random_state: int = 42, on_chunk: Optional[Callable] = None) -> pd.DataFrame:
+        """
+        Load a CSV with the inferred schema
+
+        Args:
+            path (str): CSV file path
+            sample_size (int): If set, return a uniform sample of at most this
+                many rows, streamed so the whole file never sits in memory
+            random_state (int): Seed for the sample
+            on_chunk (callable): Called with every parsed chunk (or the whole
+                frame), e.g. to gather statistics in the same pass
+
+        Returns:
+            DataFrame: Loaded (or sampled) data
+        """
+        if sample_size is not None:
+            return self.reservoir_sample(path, sample_size, random_state, on_chunk)
+
+        schema = self.infer_schema(path)
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self.iter_chunks(path, schema=schema):
+            if on_chunk is not None:
+                on_chunk(chunk)
+            chunks.append(chunk)
+        if chunks:
+            frame = self._concat(chunks, [col for col, dtype in schema.items() if dtype == 'category'])
+        else:
+            frame = pd.read_csv(path, dtype=schema, nrows=0)
+        self._record(frame, len(frame), start, 'c')
+        return frame
+
+    @staticmethod
+    def _concat(chunks, categorical) -> pd.DataFrame:
+        """
+        Join downcast chunks into one frame
+
+        Numeric columns take the widest type any chunk needed. Categorical
+        columns get the union of the chunks' categories first; concat would
+        turn differing categories into object strings.
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+        for col in categorical:
+            categories = chunks[0][col].cat.categories
+            for chunk in chunks[1:]:
+                categories = categories.union(chunk[col].cat.categories)
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+        return pd.concat(chunks, ignore_index=True)
+
+    def iter_chunks(self, path: str, chunksize: Optional[int] = None,
+                    schema: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream a CSV as downcast chunks
+
+        Categorical columns are per chunk, so their categories (and codes)
+        can differ between chunks.
+        """
+        if schema is None:
+            schema = self.infer_schema(path)
+        for chunk in pd.read_csv(path, dtype=schema, chunksize=chunksize or self.chunksize):
+            yield self._downcast(chunk)
+
+    def reservoir_sample(self, path: str, n_rows: int, random_state: int = 42,
+                         on_chunk: Optional[Callable] = None) -> pd.DataFrame:
+        """
+        Uniform sample of n_rows rows from a file of any size
+
+        Each row gets a random key and the n_rows smallest keys are kept
+        (equivalent to reservoir sampling). Only rows that beat the current
+        threshold are materialised, so memory stays at one chunk plus the
+        sample.
+        """
+        schema = self.infer_schema(path)
+        categorical = [col for col, dtype in schema.items() if dtype == 'category']
+        rng = np.random.default_rng(random_state)
+        start = time.perf_counter()
+
+        reservoir, keys = None, np.empty(0)
+        threshold = np.inf
+        rows_read = 0
+        for chunk in self.iter_chunks(path, schema=schema):
+            rows_read += len(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+            chunk_keys = rng.random(len(chunk))
+            keep = chunk_keys < threshold
+            if not keep.any():
+                continue
+            # Categories differ per chunk; hold strings until the end
+            candidates = chunk[keep].astype({col: object for col in categorical})
+            if reservoir is None:
+                reservoir, keys = candidates, chunk_keys[keep]
+            else:
+                reservoir = pd.concat([reservoir, candidates], ignore_index=True)
+                keys = np.concatenate([keys, chunk_keys[keep]])
+            if len(keys) > n_rows:
+                order = np.argpartition(keys, n_rows - 1)[:n_rows]
+                reservoir, keys = reservoir.iloc[order], keys[order]
+                threshold = keys.max()
+
+        if reservoir is None:
+            reservoir = pd.read_csv(path, dtype=schema, nrows=0)
+        reservoir = self._downcast(
+            reservoir.reset_index(drop=True).astype({col: 'category' for col in categorical})
+        )
+        self._record(reservoir, rows_read, start, 'c')
+        return reservoir
@@ -1,11 +1,21 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify
 import logging
 import os
+import fcntl
+import glob
+import shutil
+import time
+import threading
 from dotenv import load_dotenv
 from functools import wraps
+from batching import MicroBatcher
+from forest_scorer import CompiledIsolationForest
+from retraining import RetrainingManager
+from payloads import parse_features, parse_entity_ids, align_to_schema, PayloadError
+from feature_store import AccessFeatureStore
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +27,20 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 
+# The default "full" role keeps the feature store, the retraining window and
+# /train jobs in memory, so it runs as a single worker process. The "scoring"
+# role serves only /detect on posted feature rows and keeps no state, so it
+# scales to any number of workers that pick up the models "full" saves.
+DETECTOR_ROLE = os.getenv('DETECTOR_ROLE', 'full')
+if DETECTOR_ROLE not in ('full', 'scoring'):
+    raise ValueError(f"DETECTOR_ROLE must be 'full' or 'scoring', got {DETECTOR_ROLE!r}")
+SCORING_ONLY = DETECTOR_ROLE == 'scoring'
+# gunicorn.conf.py runs an app that sets this in one worker
+SINGLE_WORKER = not SCORING_ONLY
+
+# Endpoints that need the in-memory state, registered in the full role only
+stateful = Blueprint('stateful', __name__)
+
 # Simple token-based authentication
 API_TOKEN = os.getenv('API_TOKEN', 'trustvault-ml-token')
 
@@ -36,7 +60,42 @@ class AnomalyDetector:
     """
     
     def __init__(self):
-        self.model = IsolationForest(
+        self.is_trained = False
+        # (model, scorer) pair read by scoring; replaced with one assignment.
+        # The sklearn model is None until first use after a mapped forest load.
+        self._active = (self._build_model(), None)
+        self._model_path = None
+        self._lock = threading.Lock()
+        
+    @property
+    def model(self):
+        """The sklearn model, deserialized lazily after a mapped forest load"""
+        model, scorer = self._active
+        if model is None:
+            import joblib
+            with self._lock:
+                model, scorer = self._active
+                if model is None:
+                    model = joblib.load(self._model_path)
+                    self._active = (model, scorer)
+        return model
+        
+    @property
+    def scorer(self):
+        return self._active[1]
+        
+    @property
+    def feature_names(self):
+        """Feature order the current model was trained on, if known"""
+        if not self.is_trained:
+            return None
+        scorer = self.scorer
+        if scorer is not None:
+            return scorer.feature_names
+        return getattr(self.model, 'feature_names_in_', None)
+        
+    def _build_model(self):
+        return IsolationForest(
             n_estimators=100, 
             max_samples='auto',
             contamination=float(os.getenv('ANOMALY_CONTAMINATION', 0.1)),
@@ -46,12 +105,29 @@ class AnomalyDetector:
             random_state=42,
             verbose=0
         )
-        self.is_trained = False
+        
+    def _compile_scorer(self, model):
+        """Export a trained forest into a flat, vectorized scorer"""
+        try:
+            return CompiledIsolationForest(model)
+        except Exception as e:
+            logger.warning(f"Falling back to sklearn scoring, could not compile forest: {e}")
+            return None
+        
+    def _swap_model(self, model):
+        """Atomically replace the serving model with a fully trained one"""
+        scorer = self._compile_scorer(model)
+        with self._lock:
+            self._active = (model, scorer)
+        self.is_trained = True
         
     def train(self, data):
         """
         Train the anomaly detection model
         
+        A fresh model is fitted off to the side and swapped in only once it
+        is complete, so concurrent detection keeps using the previous model.
+        
         Args:
             data (DataFrame): Training data with access patterns
         """
@@ -60,8 +136,9 @@ class AnomalyDetector:
             return False
             
         try:
-            self.model.fit(data)
-            self.is_trained = True
+            model = self._build_model()
+            model.fit(data)
+            self._swap_model(model)
             logger.info("Anomaly detection model trained successfully")
             return True
         except Exception as e:
@@ -115,79 +192,327 @@ class AnomalyDetector:
         except Exception as e:
             logger.error(f"Error calculating anomaly scores: {e}")
             return None
+    
+    def score(self, data):
+        """
+        Flag anomalies and compute anomaly scores in a single forest traversal
+        
+        Equivalent to detect_anomalies() plus get_anomaly_scores(), but the
+        labels are derived by thresholding the scores against the model's
+        offset_ instead of running predict() separately.
+        
+        Args:
+            data (DataFrame): Data to score
+            
+        Returns:
+            tuple: (anomalies, scores) NumPy arrays, where anomalies is a
+                boolean array and scores are positive-is-anomalous
+        """
+        if not self.is_trained:
+            logger.warning("Model not trained yet")
+            return None
+            
+        try:
+            model, scorer = self._active
+            if scorer is None:
+                scorer = model
+                if isinstance(data, np.ndarray) and hasattr(model, 'feature_names_in_'):
+                    data = pd.DataFrame(data, columns=model.feature_names_in_)
+            raw_scores = scorer.score_samples(data)
+            # predict() flags rows whose decision_function (score - offset_) is negative
+            anomalies = raw_scores < scorer.offset_
+            return anomalies, -raw_scores
+        except Exception as e:
+            logger.error(f"Error scoring anomalies: {e}")
+            return None
         
     def save_model(self, path='anomaly_model.pkl'):
+        """
+        Save the model as a new version and point path at it
+        
+        The pickle and the flat forest are written together into a fresh
+        <name>.v<time>-<pid> directory next to path. path itself is a
+        symlink to the pickle inside it, replaced with one rename, so readers
+        always see one complete version. Saves from several processes take
+        turns on an exclusive lock file, so versions are never pruned while
+        being written.
+        """
         import joblib
-        joblib.dump(self.model, path)
-        logging.info(f"Model saved to {path}")
+        with self._lock:
+            model, scorer = self._active
+            model_path = self._model_path
+        if model is None:
+            model = joblib.load(model_path)
+            
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                version_dir = f"{os.path.splitext(path)[0]}.v{time.time_ns()}-{os.getpid()}"
+                os.makedirs(version_dir)
+                joblib.dump(model, os.path.join(version_dir, 'model.pkl'))
+                if scorer is not None:
+                    # Uncompressed .npy arrays, so loading can map them
+                    scorer.save(os.path.join(version_dir, 'forest'))
+                    
+                link_path = f"{path}.tmp-{os.getpid()}"
+                os.symlink(os.path.join(os.path.basename(version_dir), 'model.pkl'), link_path)
+                os.replace(link_path, path)
+                self._prune_versions(path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        logging.info(f"Model saved to {version_dir}")
         
     def load_model(self, path='anomaly_model.pkl'):
+        """
+        Load a saved model
+        
+        path is resolved once, so the pickle and the flat forest always come
+        from the same saved version. The forest arrays are mapped read-only,
+        so all worker processes share one copy through the page cache, and
+        the sklearn pickle is only read if a code path actually needs it.
+        """
         import joblib
-        if os.path.exists(path):
-            self.model = joblib.load(path)
+        if not os.path.exists(path):
+            return
+        model_path = os.path.realpath(path)
+        forest_path = os.path.join(os.path.dirname(model_path), 'forest')
+        if os.path.islink(path) and os.path.isdir(forest_path):
+            scorer = CompiledIsolationForest.load(forest_path, mmap_mode='r')
+            with self._lock:
+                self._model_path = model_path
+                self._active = (None, scorer)
             self.is_trained = True
-            logging.info(f"Model loaded from {path}")
+            logging.info(f"Model mapped from {forest_path}")
+        else:
+            # Unpickling copies the tree nodes anyway, so there is nothing to map
+            self._swap_model(joblib.load(model_path))
+            logging.info(f"Model loaded from {model_path}")
+            
+    def saved_signature(self, path='anomaly_model.pkl'):
+        """Identity of the saved version, to notice a newer save"""
+        try:
+            return os.path.realpath(path), os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+            
+    @staticmethod
+    def _prune_versions(path, keep=2):
+        """Remove saved versions older than the newest `keep` up to the current one"""
+        current = os.path.dirname(os.path.realpath(path))
+        versions = sorted(glob.glob(f"{glob.escape(os.path.splitext(path)[0])}.v*"))
+        paths = [os.path.realpath(v) for v in versions]
+        if current not in paths:
+            return
+        # A process that resolved an older version may still be reading it
+        for version in versions[:max(paths.index(current) + 1 - keep, 0)]:
+            shutil.rmtree(version, ignore_errors=True)
 
 # Initialize the detector
 detector = AnomalyDetector()
 detector.load_model()
 
-@app.route('/train', methods=['POST'])
+def score_batch(df):
+    """Score a (possibly coalesced) batch of access patterns"""
+    result = detector.score(df)
+    if result is None:
+        raise RuntimeError("Failed to detect anomalies")
+    return result
+
+# Coalesce concurrent /detect requests; a window of 0 disables batching
+BATCH_WINDOW_MS = float(os.getenv('DETECT_BATCH_WINDOW_MS', 2))
+batcher = MicroBatcher(
+    score_batch,
+    window_ms=BATCH_WINDOW_MS,
+    max_batch_rows=int(os.getenv('DETECT_MAX_BATCH_ROWS', 1024))
+) if BATCH_WINDOW_MS > 0 else None
+
+# Sliding-window retraining in the background with atomic model swaps
+retrainer = None if SCORING_ONLY else RetrainingManager(
+    detector,
+    window_rows=int(os.getenv('RETRAIN_WINDOW_ROWS', 100000)),
+    interval_seconds=float(os.getenv('RETRAIN_INTERVAL_SECONDS', 0)),
+    drift_threshold=float(os.getenv('RETRAIN_DRIFT_THRESHOLD', 0)),
+    expected_rate=float(os.getenv('ANOMALY_CONTAMINATION', 0.1)),
+    min_rows=int(os.getenv('RETRAIN_MIN_ROWS', 256)),
+    on_success=detector.save_model
+)
+
+def _option(name, default=None):
+    """Read an option from the query string, falling back to a JSON body"""
+    if name in request.args:
+        return request.args[name]
+    data = request.get_json(silent=True) if request.is_json else None
+    return data.get(name, default) if isinstance(data, dict) else default
+
+def _wants(name):
+    """Read a boolean option from the query string or a JSON body"""
+    value = _option(name, False)
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+RESPONSE_MODES = ('full', 'summary', 'anomalies_only', 'top_k')
+
+# Rolling per-entity access features, updated as events arrive
+feature_store = None if SCORING_ONLY else AccessFeatureStore(
+    window_seconds=int(os.getenv('FEATURE_WINDOW_SECONDS', 86400)),
+    n_buckets=int(os.getenv('FEATURE_WINDOW_BUCKETS', 24)),
+    idle_seconds=int(os.getenv('FEATURE_IDLE_SECONDS', 7 * 86400))
+)
+
+@stateful.route('/events', methods=['POST'])
+@require_auth
+def ingest_events():
+    """Ingest raw access events into the per-entity feature store"""
+    data = request.get_json(silent=True)
+    
+    if not data or 'events' not in data:
+        return jsonify({"error": "Missing required events data"}), 400
+        
+    try:
+        ingested = feature_store.ingest(data['events'])
+        return jsonify({"status": "success", "ingested": ingested, "entities": len(feature_store)})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid event: {e}"}), 400
+
+@stateful.route('/train', methods=['POST'])
 @require_auth
 def train_model():
-    """Train the anomaly detection model with historical access data"""
-    data = request.json
+    """
+    Train the anomaly detection model with historical access data
     
-    if not data or 'features' not in data:
-        return jsonify({"error": "Missing required training data"}), 400
+    Accepts row dicts, columnar JSON, .npy or Arrow bodies (see payloads.py).
+    The model is trained on exactly the posted rows. Pass "async": true to
+    queue the job and return at once; poll /train/status for the outcome.
+    """
+    try:
+        # No schema: training may replace the model's feature set
+        matrix, feature_names, _ = parse_features(request)
+    except PayloadError as e:
+        return jsonify({"error": str(e)}), 400
         
     try:
-        df = pd.DataFrame(data['features'])
-        success = detector.train(df)
-        if success:
-            detector.save_model()
-            return jsonify({"status": "success", "message": "Model trained successfully"})
-        else:
+        if matrix.shape[0] == 0:
             return jsonify({"status": "error", "message": "Failed to train model"}), 500
+        frame = pd.DataFrame(matrix, columns=feature_names, copy=False)
+        if retrainer.enabled:
+            # Later scheduled and drift jobs retrain on this data too
+            retrainer.add_batch(frame)
+        # Queued behind any running job, so training never runs twice at once
+        job_id = retrainer.request('manual', data=frame)
+        
+        if _wants('async'):
+            return jsonify({"status": "accepted", "job_id": job_id}), 202
+            
+        status = retrainer.wait(job_id)
+        if status['state'] == 'succeeded':
+            return jsonify({"status": "success", "message": "Model trained successfully", "job_id": job_id})
+        return jsonify({"status": "error", "message": status['error'] or "Failed to train model"}), 500
     except Exception as e:
         logger.error(f"Error in training endpoint: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@stateful.route('/train/status', methods=['GET'])
+@require_auth
+def train_status():
+    """Status and timing of the current or most recent retraining job"""
+    return jsonify({"status": "success", "job": retrainer.get_status()})
+
 @app.route('/detect', methods=['POST'])
 @require_auth
 def detect():
-    """Detect anomalies in access patterns"""
-    data = request.json
+    """
+    Detect anomalies in access patterns
     
-    if not data or 'features' not in data:
-        return jsonify({"error": "Missing required features data"}), 400
-        
+    Row-dict requests get one result object per row; columnar JSON, .npy and
+    Arrow requests get columnar "is_anomaly" / "anomaly_score" arrays.
+    Sending {"entity_ids": [...]} scores the current feature-store vectors
+    (full role only).
+    
+    The "mode" option trims the response for large batches: "summary" returns
+    counts only, "anomalies_only" the indexes and scores of flagged rows, and
+    "top_k" the "k" highest-scoring rows.
+    """
     if not detector.is_trained:
         return jsonify({"error": "Model not trained yet"}), 400
         
+    mode = _option('mode', 'full')
+    if mode not in RESPONSE_MODES:
+        return jsonify({"error": f"Unknown mode '{mode}', expected one of {list(RESPONSE_MODES)}"}), 400
     try:
-        df = pd.DataFrame(data['features'])
-        anomalies = detector.detect_anomalies(df)
-        scores = detector.get_anomaly_scores(df)
+        k = int(_option('k', 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+        
+    data = request.get_json(silent=True) if request.is_json else None
+    try:
+        if isinstance(data, dict) and 'entity_ids' in data:
+            if feature_store is None:
+                raise PayloadError("entity_ids need the feature store, which only the full detector keeps")
+            entity_ids = parse_entity_ids(data['entity_ids'])
+            matrix, feature_names = align_to_schema(
+                *feature_store.get_features(entity_ids), detector.feature_names
+            )
+            columnar = True
+        else:
+            matrix, feature_names, columnar = parse_features(request, detector.feature_names)
+    except PayloadError as e:
+        return jsonify({"error": str(e)}), 400
         
-        if anomalies is None or scores is None:
+    try:
+        try:
+            anomalies, scores = batcher.score(matrix) if batcher else score_batch(matrix)
+        except RuntimeError:
             return jsonify({"status": "error", "message": "Failed to detect anomalies"}), 500
+        
+        if retrainer is not None and retrainer.enabled:
+            retrainer.add_batch(pd.DataFrame(matrix, columns=feature_names, copy=False))
+            retrainer.observe(anomalies)
             
-        response = {
-            "status": "success",
-            "results": [
+        total = len(anomalies)
+        detected = int(np.count_nonzero(anomalies))
+        summary = {
+            "total_records": total,
+            "anomalies_detected": detected,
+            "anomaly_rate": detected / total if total else 0
+        }
+        
+        if mode == 'summary':
+            return jsonify({"status": "success", "summary": summary})
+        if mode == 'anomalies_only':
+            index = np.flatnonzero(anomalies)
+            results = {
+                "index": index.tolist(),
+                "anomaly_score": scores[index].tolist()
+            }
+        elif mode == 'top_k':
+            k = max(0, min(k, total))
+            # Partial sort: only the k selected rows are ordered
+            index = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, dtype=np.intp)
+            index = index[np.argsort(-scores[index], kind='stable')]
+            results = {
+                "index": index.tolist(),
+                "is_anomaly": anomalies[index].tolist(),
+                "anomaly_score": scores[index].tolist()
+            }
+        elif columnar:
+            results = {
+                "is_anomaly": anomalies.tolist(),
+                "anomaly_score": scores.tolist()
+            }
+        else:
+            results = [
                 {
                     "index": i,
-                    "is_anomaly": bool(anomaly),
-                    "anomaly_score": float(score)
+                    "is_anomaly": anomaly,
+                    "anomaly_score": score
                 }
-                for i, (anomaly, score) in enumerate(zip(anomalies, scores))
-            ],
-            "summary": {
-                "total_records": len(anomalies),
-                "anomalies_detected": sum(anomalies),
-                "anomaly_rate": sum(anomalies) / len(anomalies) if anomalies else 0
-            }
+                for i, (anomaly, score) in enumerate(zip(anomalies.tolist(), scores.tolist()))
+            ]
+        response = {
+            "status": "success",
+            "results": results,
+            "summary": summary
         }
         
         return jsonify(response)
@@ -195,6 +520,46 @@ def detect():
         logger.error(f"Error in detection endpoint: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Seconds between checks for a model saved by another worker (0 disables)
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', 5))
+
+if not SCORING_ONLY:
+    app.register_blueprint(stateful)
+
+def _watch_saved_model():
+    """Load the model whenever another process (the full detector) saves a retrained one"""
+    signature = detector.saved_signature()
+    while True:
+        time.sleep(MODEL_RELOAD_INTERVAL)
+        try:
+            current = detector.saved_signature()
+            if current != signature:
+                detector.load_model()
+                signature = current
+        except Exception as e:
+            # Keep watching; the next check retries the load
+            logger.error(f"Error reloading saved model: {e}")
+
+def after_fork():
+    """
+    Set up a pre-fork server worker (see gunicorn.conf.py)
+
+    The model loaded in the parent is shared copy-on-write; the background
+    threads are not inherited and are started again here. Scoring workers
+    each batch their own requests and load the models the full detector
+    saves.
+    """
+    if batcher:
+        batcher.after_fork()
+    if retrainer is not None:
+        retrainer.after_fork()
+    if MODEL_RELOAD_INTERVAL > 0:
+        threading.Thread(target=_watch_saved_model, daemon=True).start()
+
+def reload_models():
+    """Reload the saved model in the pre-fork server's parent, before new workers fork"""
+    detector.load_model()
+
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 5002))
     app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# pandas' default siphash key; change it to re-randomise bucket assignment
+DEFAULT_HASH_KEY = '0123456789123456'
+
+_to_str = np.frompyfunc(str, 1, 1)
+
+class HashingEncoder:
+    """
+    Stateless categorical encoder using the hashing trick
+
+    Values are hashed (pandas' vectorized siphash) into n_buckets integer
+    codes, so no vocabulary is fitted or stored and unseen values at
+    inference simply land in some bucket instead of raising. Collisions are
+    the price: keep n_buckets well above the number of frequent values.
+    Drop-in for LabelEncoder in the preprocessing code paths.
+    """
+
+    def __init__(self, n_buckets=2**20, hash_key=DEFAULT_HASH_KEY):
+        """
+        Args:
+            n_buckets (int): Number of hash buckets (codes are 0..n_buckets-1)
+            hash_key (str): 16-character siphash key
+        """
+        if n_buckets < 1:
+            raise ValueError("n_buckets must be positive")
+        self.n_buckets = int(n_buckets)
+        self.hash_key = hash_key
+
+    def fit(self, values=None):
+        """No-op, kept for LabelEncoder compatibility"""
+        return self
+
+    def transform(self, values):
+        """
+        Hash values into bucket codes
+
+        Args:
+            values: Series, Categorical, ndarray or list of values
+
+        Returns:
+            ndarray: int64 bucket code per value; missing values share a bucket
+        """
+        if isinstance(values, pd.Series):
+            values = values.array
+        if isinstance(values, pd.Categorical):
+            # Hashes only the categories, then gathers by code
+            category_hashes = self._hash_strings(np.asarray(values.categories, dtype=object))
+            missing_hash = self._hash_strings(np.array([None], dtype=object))
+            hashes = np.append(category_hashes, missing_hash)[values.codes]
+        else:
+            hashes = self._hash_strings(np.asarray(values, dtype=object))
+
+        n = np.uint64(self.n_buckets)
+        if self.n_buckets & (self.n_buckets - 1) == 0:
+            hashes &= n - np.uint64(1)
+        else:
+            hashes %= n
+        return hashes.astype(np.int64)
+
+    def _hash_strings(self, values):
+        """
+        Siphash values by their string form, so 5, '5' and a category 5 share
+        a bucket; every kind of missing value (None, NaN, NaT, pd.NA) shares one
+        """
+        values = values.ravel()
+        if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+            # All strings already, the common case: hash as is
+            return pd.util.hash_array(values, hash_key=self.hash_key, categorize=False)
+        missing = pd.isna(values)
+        if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+            # str() per element keeps object dtype; astype(str) would go
+            # through a fixed-width unicode array as wide as the longest value
+            values = values.copy()
+            values[~missing] = _to_str(values[~missing])
+        elif missing.any():
+            values = values.copy()
+        values[missing] = None
+        return pd.util.hash_array(values, hash_key=self.hash_key, categorize=False)
+
+    def fit_transform(self, values):
+        return self.transform(values)
+
+    def transform_value(self, value):
+        """Bucket code for a single value"""
+        return int(self.transform(np.array([value], dtype=object))[0])
@@ -0,0 +1,201 @@
+import threading
+import time
+import zlib
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Bits per bucket in the distinct-resource bitmap (linear counting sketch)
+BITMAP_WORDS = 4
+BITMAP_BITS = BITMAP_WORDS * 64
+
+class AccessFeatureStore:
+    """
+    In-process, incrementally maintained access-pattern features per entity
+
+    Each entity owns one row of fixed-size NumPy arrays holding a ring of
+    time buckets covering the rolling window. An event updates a single
+    bucket in O(1); reading features sums the live buckets, so no audit log
+    query is needed before scoring. Distinct resources are estimated with a
+    small per-bucket bitmap (linear counting). Idle entities are evicted and
+    their rows reused.
+    """
+
+    FEATURE_NAMES = ['access_count', 'distinct_resources', 'off_hours_ratio']
+
+    def __init__(self, window_seconds=86400, n_buckets=24, business_hours=(9, 18),
+                 idle_seconds=7 * 86400, initial_capacity=1024):
+        """
+        Args:
+            window_seconds (int): Length of the rolling window
+            n_buckets (int): Number of time buckets in the window
+            business_hours (tuple): [start, end) UTC hours considered on-hours
+            idle_seconds (int): Entities unseen for this long are evicted
+            initial_capacity (int): Rows allocated up front (grows by doubling)
+        """
+        self.window_seconds = window_seconds
+        self.n_buckets = n_buckets
+        self.bucket_seconds = window_seconds / n_buckets
+        self.business_hours = business_hours
+        self.idle_seconds = idle_seconds
+
+        self._rows = {}
+        self._free_rows = []
+        self._lock = threading.Lock()
+        self._last_eviction = time.time()
+        self._allocate(initial_capacity)
+
+    def _allocate(self, capacity):
+        self._counts = np.zeros((capacity, self.n_buckets), dtype=np.int32)
+        self._off_hours = np.zeros((capacity, self.n_buckets), dtype=np.int32)
+        self._bitmaps = np.zeros((capacity, self.n_buckets, BITMAP_WORDS), dtype=np.uint64)
+        # Absolute bucket number each slot currently holds; -1 means empty
+        self._epochs = np.full((capacity, self.n_buckets), -1, dtype=np.int64)
+        self._last_seen = np.zeros(capacity, dtype=np.float64)
+        self._free_rows = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        old = (self._counts, self._off_hours, self._bitmaps, self._epochs, self._last_seen)
+        capacity = len(self._last_seen)
+        self._allocate(capacity * 2)
+        for new_array, old_array in zip(
+                (self._counts, self._off_hours, self._bitmaps, self._epochs, self._last_seen), old):
+            new_array[:capacity] = old_array
+        self._free_rows = list(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def _row(self, entity_id):
+        row = self._rows.get(entity_id)
+        if row is None:
+            if not self._free_rows:
+                self._grow()
+            row = self._free_rows.pop()
+            self._counts[row] = 0
+            self._off_hours[row] = 0
+            self._bitmaps[row] = 0
+            self._epochs[row] = -1
+            # The row may be reused after an eviction
+            self._last_seen[row] = 0
+            self._rows[entity_id] = row
+        return row
+
+    @staticmethod
+    def _timestamp(value):
+        if value is None:
+            return time.time()
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                # Business hours are UTC, so naive times are too
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        ts = float(value)
+        if not math.isfinite(ts):
+            raise ValueError(f"Invalid timestamp {value!r}")
+        return ts
+
+    def _parse(self, events):
+        """Validate a whole batch up front, so a bad event leaves the store untouched"""
+        if not isinstance(events, list):
+            raise TypeError("events must be a list")
+        parsed = []
+        for event in events:
+            if not isinstance(event, dict):
+                raise TypeError(f"Event must be an object, got {type(event).__name__}")
+            entity_id = event['user_id']
+            hash(entity_id)
+            parsed.append((entity_id, self._timestamp(event.get('timestamp')), event.get('resource_id')))
+        return parsed
+
+    def ingest(self, events):
+        """
+        Fold raw access events into the rolling aggregates
+
+        Args:
+            events (list): Dicts with "user_id", "resource_id" and an optional
+                "timestamp" (epoch seconds, or ISO 8601 where no offset means
+                UTC; defaults to now)
+
+        Returns:
+            int: Number of events ingested
+
+        Raises:
+            KeyError, TypeError, ValueError: An event is malformed; none of
+                the batch is ingested
+        """
+        parsed = self._parse(events)
+        start_hour, end_hour = self.business_hours
+        with self._lock:
+            for entity_id, ts, resource_id in parsed:
+                row = self._row(entity_id)
+                epoch = int(ts // self.bucket_seconds)
+                slot = epoch % self.n_buckets
+
+                if self._epochs[row, slot] != epoch:
+                    if self._epochs[row, slot] > epoch:
+                        continue  # older than the window this slot now covers
+                    self._epochs[row, slot] = epoch
+                    self._counts[row, slot] = 0
+                    self._off_hours[row, slot] = 0
+                    self._bitmaps[row, slot] = 0
+
+                self._counts[row, slot] += 1
+                hour = int(ts // 3600) % 24
+                if not start_hour <= hour < end_hour:
+                    self._off_hours[row, slot] += 1
+                bit = zlib.crc32(str(resource_id).encode()) % BITMAP_BITS
+                self._bitmaps[row, slot, bit >> 6] |= np.uint64(1 << (bit & 63))
+                self._last_seen[row] = max(self._last_seen[row], ts)
+
+            now = time.time()
+            if now - self._last_eviction > self.bucket_seconds:
+                self._evict_idle(now)
+        return len(parsed)
+
+    def _evict_idle(self, now):
+        cutoff = now - self.idle_seconds
+        for entity_id in [e for e, row in self._rows.items() if self._last_seen[row] < cutoff]:
+            self._free_rows.append(self._rows.pop(entity_id))
+        self._last_eviction = now
+
+    def evict_idle(self, now=None):
+        """Drop entities with no events within idle_seconds"""
+        with self._lock:
+            self._evict_idle(time.time() if now is None else now)
+
+    def get_features(self, entity_ids, now=None):
+        """
+        Current feature vectors for the given entities
+
+        Args:
+            entity_ids (list): Entities to look up (unknown ones get zeros)
+            now (float): Evaluation time in epoch seconds (defaults to now)
+
+        Returns:
+            tuple: (matrix, feature_names) with one row per entity
+        """
+        current_epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            known = [(i, self._rows[e]) for i, e in enumerate(entity_ids) if e in self._rows]
+            matrix = np.zeros((len(entity_ids), len(self.FEATURE_NAMES)))
+            if not known:
+                return matrix, list(self.FEATURE_NAMES)
+            positions, rows = map(np.asarray, zip(*known))
+            live = self._epochs[rows] > current_epoch - self.n_buckets
+            counts = np.where(live, self._counts[rows], 0).sum(axis=1)
+            off_hours = np.where(live, self._off_hours[rows], 0).sum(axis=1)
+            bitmaps = np.bitwise_or.reduce(
+                np.where(live[:, :, None], self._bitmaps[rows], np.uint64(0)), axis=1
+            )
+
+        set_bits = np.unpackbits(bitmaps.view(np.uint8), axis=1).sum(axis=1)
+        zero_bits = np.maximum(BITMAP_BITS - set_bits, 1)
+        distinct = np.where(counts > 0, -BITMAP_BITS * np.log(zero_bits / BITMAP_BITS), 0)
+
+        matrix[positions, 0] = counts
+        matrix[positions, 1] = np.minimum(np.round(distinct), counts)
+        matrix[positions, 2] = np.divide(off_hours, counts, out=np.zeros(len(rows)), where=counts > 0)
+        return matrix, list(self.FEATURE_NAMES)
+
+    def __len__(self):
+        return len(self._rows)
@@ -0,0 +1,223 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+
+def _average_path_length(n_samples):
+    """
+    Average path length of an unsuccessful BST search over n_samples points,
+    the normalising constant c(n) from the Isolation Forest paper
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    # c(n) is 0 for n <= 1 and 1 for n == 2, as in sklearn
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    lengths[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return lengths
+
+class CompiledIsolationForest:
+    """
+    Flattened, NumPy-vectorized scorer for a fitted sklearn IsolationForest
+
+    All trees are exported into shared flat node arrays (feature, threshold,
+    child indexes and per-leaf path lengths). Rows are scored by walking
+    every tree one level at a time with vectorized gathers, avoiding
+    sklearn's per-call validation and per-estimator Python overhead. Scores
+    match IsolationForest.score_samples within float tolerance.
+    """
+
+    # Node arrays stored as individual .npy files in a saved artifact
+    ARRAYS = ('feature', 'threshold', 'children', 'path_length', 'missing_go_to_left', 'roots')
+    # Rows traversed together per chunk
+    CHUNK_ROWS = 2048
+
+    def __init__(self, model):
+        """
+        Args:
+            model (IsolationForest): Fitted model to compile
+        """
+        self.offset_ = model.offset_
+        self.n_features = model.n_features_in_
+        self.feature_names = getattr(model, 'feature_names_in_', None)
+
+        subsample_features = model._max_features != model.n_features_in_
+
+        features, thresholds, lefts, rights, path_lengths, nan_left = [], [], [], [], [], []
+        roots = []
+        offset = 0
+        max_depth = 0
+
+        for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+            t = tree.tree_
+            n_nodes = t.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = t.children_left == -1
+
+            # Leaves point to themselves so extra traversal steps are no-ops
+            left = np.where(is_leaf, node_ids, t.children_left) + offset
+            right = np.where(is_leaf, node_ids, t.children_right) + offset
+
+            feature = np.where(is_leaf, 0, t.feature)
+            if subsample_features:
+                feature = np.asarray(tree_features)[feature]
+
+            depth = np.zeros(n_nodes, dtype=np.int64)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[t.children_left[node]] = depth[node] + 1
+                    depth[t.children_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            missing_left = getattr(t, 'missing_go_to_left', np.zeros(n_nodes, dtype=bool))
+
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            lefts.append(left)
+            rights.append(right)
+            path_lengths.append(depth + _average_path_length(t.n_node_samples))
+            nan_left.append(np.asarray(missing_left, dtype=bool) | is_leaf)
+            roots.append(offset)
+            offset += n_nodes
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        # Interleaved [left, right] pairs so one gather picks the next node
+        self.children = np.stack(
+            [np.concatenate(lefts), np.concatenate(rights)], axis=1
+        ).ravel().astype(np.intp)
+        self.path_length = np.concatenate(path_lengths)
+        self.missing_go_to_left = np.concatenate(nan_left)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.denominator = len(model.estimators_) * _average_path_length([model.max_samples_])[0]
+
+    def _as_array(self, data):
+        if hasattr(data, 'columns'):
+            if self.feature_names is not None and not np.array_equal(data.columns, self.feature_names):
+                data = data[self.feature_names]
+            data = data.to_numpy()
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(data, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        return X
+
+    def score_samples(self, data):
+        """
+        Compute IsolationForest.score_samples (more negative = more anomalous)
+
+        Args:
+            data (DataFrame or array): Rows to score
+
+        Returns:
+            ndarray: Raw scores, identical in meaning to sklearn's
+        """
+        X = self._as_array(data)
+        if X.shape[0] > self.CHUNK_ROWS:
+            # Keep the per-level working set cache-sized on large batches
+            return np.concatenate([
+                self.score_samples(X[start:start + self.CHUNK_ROWS])
+                for start in range(0, X.shape[0], self.CHUNK_ROWS)
+            ])
+        n_samples = X.shape[0]
+        has_nan = np.isnan(X).any()
+
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_samples) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_samples, len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            values = flat_X[row_offsets + self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(values) & self.missing_go_to_left[nodes]
+            nodes = self.children[2 * nodes + ~go_left]
+
+        depths = self.path_length[nodes].sum(axis=1)
+        if self.denominator == 0:
+            # A single training sample: depths and c(1) are both 0, and
+            # sklearn scores every row as if the ratio were 1
+            return np.full(n_samples, -0.5)
+        return -(2.0 ** (-depths / self.denominator))
+
+    def decision_function(self, data):
+        """Shifted scores; negative values are anomalies"""
+        return self.score_samples(data) - self.offset_
+
+    def save(self, path):
+        """
+        Save the flat arrays as an uncompressed, memory-mappable artifact
+
+        The artifact is a directory with one .npy file per node array and a
+        manifest.json with the scalar parameters. It is written under a
+        unique temporary name next to the destination and renamed into
+        place, so no reader sees it half written. An existing artifact is
+        never replaced (that can't be done atomically for a directory):
+        write each version to a new path and switch a pointer to it.
+
+        Args:
+            path (str): Artifact directory, which must not exist yet
+
+        Raises:
+            FileExistsError: path already exists
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        tmp_path = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.tmp-", dir=parent)
+        try:
+            for name in self.ARRAYS:
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+            manifest = {
+                'offset': float(self.offset_),
+                'n_features': int(self.n_features),
+                'feature_names': None if self.feature_names is None else [str(n) for n in self.feature_names],
+                'max_depth': int(self.max_depth),
+                'denominator': float(self.denominator)
+            }
+            with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            if os.path.exists(path):
+                raise FileExistsError(f"Forest artifact already exists: {path}")
+            try:
+                os.rename(tmp_path, path)
+            except OSError as e:
+                # Another writer got there first
+                raise FileExistsError(f"Forest artifact already exists: {path}") from e
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load a saved artifact, mapping the node arrays read-only by default
+
+        With mmap_mode='r' the arrays are backed by the OS page cache, so
+        every worker process scoring with the same artifact shares one copy.
+
+        Args:
+            path (str): Artifact directory written by save()
+            mmap_mode (str): Passed to np.load (None loads private copies)
+
+        Returns:
+            CompiledIsolationForest: Ready-to-use scorer
+        """
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+
+        scorer = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(scorer, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+        scorer.offset_ = manifest['offset']
+        scorer.n_features = manifest['n_features']
+        names = manifest['feature_names']
+        scorer.feature_names = None if names is None else np.asarray(names, dtype=object)
+        scorer.max_depth = manifest['max_depth']
+        scorer.denominator = manifest['denominator']
+        return scorer
@@ -0,0 +1,67 @@
+"""
+Production server settings: gunicorn workers forked from a preloaded app
+
+    gunicorn -c gunicorn.conf.py detector:app
+    gunicorn -c gunicorn.conf.py app:app
+
+The app module is imported once in the master, so models are loaded before
+the workers fork and shared with them copy-on-write. Each worker then calls
+the module's after_fork() to restart the background threads a fork leaves
+behind. SIGHUP reloads gracefully: the master calls the module's
+reload_models() and replaces the workers once they finish their requests.
+A module that keeps its state in process memory sets SINGLE_WORKER (the
+detector does, except with DETECTOR_ROLE=scoring) and is always run in one
+worker, whatever WEB_CONCURRENCY says.
+
+Tuned with environment variables: PORT, WEB_CONCURRENCY (workers, default
+one per CPU), GUNICORN_THREADS (per worker), GUNICORN_TIMEOUT,
+GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE, GUNICORN_MAX_REQUESTS and
+GUNICORN_ACCESS_LOG (a path or "-" for stdout).
+"""
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5002)}"
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Recycled workers fork from the master again, so they start with the shared models
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+preload_app = True
+# Worker heartbeats on tmpfs, so a slow container disk can't stall them
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+def _service(server):
+    return sys.modules.get(server.app.app_uri.split(':')[0])
+
+def _single_worker(server):
+    if getattr(_service(server), 'SINGLE_WORKER', False) and server.cfg.workers > 1:
+        server.log.warning("%s keeps its state in process memory, running 1 worker instead of %d",
+                           server.app.app_uri, server.cfg.workers)
+        server.cfg.set('workers', 1)
+        server.num_workers = 1
+
+def when_ready(server):
+    _single_worker(server)
+
+def pre_fork(server, worker):
+    # Keep the garbage collector from writing to (and so copying) the shared objects
+    gc.freeze()
+
+def post_fork(server, worker):
+    hook = getattr(_service(server), 'after_fork', None)
+    if hook is not None:
+        hook()
+
+def on_reload(server):
+    # The reloaded config has the configured worker count again
+    _single_worker(server)
+    hook = getattr(_service(server), 'reload_models', None)
+    if hook is not None:
+        server.log.info("Reloading models before replacing workers")
+        hook()
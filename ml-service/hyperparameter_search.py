@@ -0,0 +1,257 @@
+import math
+import time
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from shared_arrays import share_arrays, load_arrays
+
+logger = logging.getLogger(__name__)
+
+# Hyperparameter grids sampled per model family
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 8, 16, 32],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': ['sqrt', 'log2', 0.5]
+    },
+    'gradient_boosting': {
+        'n_estimators': [50, 100, 200],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [2, 3, 5],
+        'subsample': [0.7, 1.0]
+    },
+    'logistic_regression': {
+        'C': [0.01, 0.1, 1.0, 10.0, 100.0]
+    }
+}
+
+def _run_trial(model: Any, arrays, n_samples: int) -> Any:
+    """Fit one configuration on the first n_samples (shuffled) rows and score it on validation data"""
+    try:
+        X_fit, y_fit, X_val, y_val = load_arrays(arrays)
+        wall, cpu = time.perf_counter(), time.process_time()
+        model.fit(X_fit[:n_samples], y_fit[:n_samples])
+        score = accuracy_score(y_val, model.predict(X_val))
+        return score, time.perf_counter() - wall, time.process_time() - cpu
+    except Exception as e:
+        return e
+
+def _stop_pool(executor: ProcessPoolExecutor):
+    """Shut the pool down without waiting, killing trials still running past the budget"""
+    # shutdown() forgets the worker processes, so take them first
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=5)
+
+class SuccessiveHalvingSearch:
+    """
+    Budgeted hyperparameter search with successive halving
+
+    Each model family starts with n_configs random configurations trained
+    on a small subset of the training rows. After every rung only the best
+    1/eta configurations per family survive and the subset grows by eta,
+    until the survivors are trained on all rows. Trials of a rung run in
+    parallel worker processes over memory-mapped data. The search stops
+    early when the wall-clock or CPU budget is spent (or the next rung is
+    predicted not to fit in it), terminating trials still running, and
+    returns for each family the best configuration of the last rung it
+    completed, along with a trace of every trial.
+    """
+
+    def __init__(self, budget_seconds: float, budget_type: str = "wall",
+                 search_spaces: Optional[Dict[str, Dict[str, list]]] = None,
+                 n_configs: int = 9, eta: int = 3, min_samples: int = 500,
+                 n_jobs: int = 1, random_state: int = 42):
+        """
+        Args:
+            budget_seconds (float): Total search budget
+            budget_type (str): 'wall' for elapsed time, 'cpu' for summed trial CPU time
+            search_spaces (dict): Family -> parameter -> candidate values
+            n_configs (int): Configurations sampled per family in the first rung
+            eta (int): Halving rate (keep 1/eta, grow data by eta)
+            min_samples (int): Smallest training subset
+            n_jobs (int): Parallel trial processes (1 runs in-process)
+            random_state (int): Seed for sampling and the validation split
+        """
+        if budget_type not in ('wall', 'cpu'):
+            raise ValueError(f"Unknown budget type: {budget_type}")
+        self.budget_seconds = budget_seconds
+        self.budget_type = budget_type
+        self.search_spaces = search_spaces or SEARCH_SPACES
+        self.n_configs = n_configs
+        self.eta = eta
+        self.min_samples = min_samples
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.trace: List[Dict[str, Any]] = []
+        self.best_params: Dict[str, Dict[str, Any]] = {}
+        self.best_scores: Dict[str, float] = {}
+
+    def _sample_configs(self, family: str, rng: np.random.Generator) -> List[Dict[str, Any]]:
+        space = self.search_spaces.get(family, {})
+        total = math.prod(len(values) for values in space.values()) if space else 1
+        configs, seen = [], set()
+        # Distinct configurations, bounded by the size of the grid
+        while len(configs) < min(self.n_configs, total):
+            config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+            key = tuple(sorted((name, repr(value)) for name, value in config.items()))
+            if key not in seen:
+                seen.add(key)
+                configs.append(config)
+        return configs
+
+    def _spent(self, start: float) -> float:
+        if self.budget_type == 'cpu':
+            return sum(trial['cpu_seconds'] for trial in self.trace)
+        return time.perf_counter() - start
+
+    def search(self, models: Dict[str, Any], X: np.ndarray, y: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """
+        Search hyperparameters for each model family
+
+        Args:
+            models (dict): Family name -> unfitted base estimator
+            X (ndarray): Training features (a validation split is held out)
+            y (ndarray): Training labels
+
+        Returns:
+            dict: Family -> best parameters found
+        """
+        start = time.perf_counter()
+        rng = np.random.default_rng(self.random_state)
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=0.2, random_state=self.random_state, stratify=y
+        )
+        # Subsets are prefixes of one shuffle, so each rung extends the last
+        order = rng.permutation(len(X_fit))
+        X_fit, y_fit = np.asarray(X_fit)[order], np.asarray(y_fit)[order]
+
+        survivors = {family: self._sample_configs(family, rng) for family in models}
+        n_rungs = max(math.ceil(math.log(max(len(c) for c in survivors.values()), self.eta)), 0) + 1
+        self.trace, self.best_params, self.best_scores = [], {}, {}
+        # rung -> family -> configurations scheduled, to tell completed rungs apart
+        self._scheduled: Dict[int, Dict[str, int]] = {}
+
+        executor = ProcessPoolExecutor(max_workers=self.n_jobs) if self.n_jobs > 1 else None
+        with tempfile.TemporaryDirectory(prefix='search_') as tmp:
+            arrays = (X_fit, y_fit, X_val, y_val)
+            if executor is not None:
+                arrays = share_arrays(tmp, arrays)
+            try:
+                for rung in range(n_rungs):
+                    n_samples = len(X_fit) if rung == n_rungs - 1 else min(
+                        len(X_fit), max(self.min_samples, len(X_fit) // self.eta ** (n_rungs - 1 - rung))
+                    )
+                    if not self._run_rung(rung, n_samples, models, survivors, arrays, executor, start):
+                        logger.info(f"Search budget spent, stopping at rung {rung} of {n_rungs}")
+                        break
+                    survivors = self._promote(rung, survivors)
+            finally:
+                if executor is not None:
+                    _stop_pool(executor)
+
+        for family in models:
+            best = self._best_trial(family)
+            if best is not None:
+                self.best_params[family] = best['params']
+                self.best_scores[family] = best['score']
+        logger.info(f"Search finished in {time.perf_counter() - start:.1f}s with {len(self.trace)} trials")
+        return self.best_params
+
+    def _run_rung(self, rung, n_samples, models, survivors, arrays, executor, start) -> bool:
+        """Run every surviving configuration on n_samples rows; False once the budget is spent"""
+        remaining = self.budget_seconds - self._spent(start)
+        previous = [t for t in self.trace if t['rung'] == rung - 1]
+        if previous:
+            # Each rung costs about as much as the last: 1/eta the configs on eta times the rows
+            estimate = sum(t['cpu_seconds' if self.budget_type == 'cpu' else 'seconds'] for t in previous)
+            if self.budget_type == 'wall' and executor is not None:
+                estimate /= self.n_jobs
+            if estimate > remaining:
+                return False
+        if remaining <= 0:
+            return False
+
+        # Round-robin across families so a tight budget still covers each of them
+        depth = max((len(configs) for configs in survivors.values()), default=0)
+        trials = [(family, configs[i]) for i in range(depth)
+                  for family, configs in survivors.items() if i < len(configs)]
+        self._scheduled[rung] = {family: len(configs) for family, configs in survivors.items()}
+        outcomes = {}
+        if executor is None:
+            for i, (family, params) in enumerate(trials):
+                if self._spent(start) >= self.budget_seconds:
+                    break
+                outcomes[i] = _run_trial(clone(models[family]).set_params(**params), arrays, n_samples)
+                self._record(rung, n_samples, family, params, outcomes[i])
+        else:
+            pending = {
+                executor.submit(_run_trial, clone(models[family]).set_params(**params), arrays, n_samples): i
+                for i, (family, params) in enumerate(trials)
+            }
+            while pending:
+                timeout = None
+                if self.budget_type == 'wall':
+                    timeout = max(self.budget_seconds - self._spent(start), 0)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    i = pending.pop(future)
+                    family, params = trials[i]
+                    outcomes[i] = future.result()
+                    self._record(rung, n_samples, family, params, outcomes[i])
+                if self._spent(start) >= self.budget_seconds:
+                    break
+            for future in pending:
+                future.cancel()
+        return len(outcomes) == len(trials)
+
+    def _record(self, rung, n_samples, family, params, outcome):
+        trial = {'family': family, 'params': params, 'rung': rung, 'n_samples': int(n_samples)}
+        if isinstance(outcome, Exception):
+            logger.warning(f"Trial {family} {params} failed: {outcome}")
+            trial.update(score=None, seconds=0.0, cpu_seconds=0.0, error=str(outcome))
+        else:
+            score, seconds, cpu_seconds = outcome
+            trial.update(score=float(score), seconds=round(seconds, 4), cpu_seconds=round(cpu_seconds, 4))
+        self.trace.append(trial)
+
+    def _best_trial(self, family):
+        """
+        Best scored trial of the last rung the family completed
+
+        Scores on different subsets aren't comparable, and a rung cut short
+        by the budget only holds whichever configurations happened to finish,
+        so it is used only when no rung was completed.
+        """
+        trials = [t for t in self.trace if t['family'] == family]
+        for rung in sorted(self._scheduled, reverse=True):
+            in_rung = [t for t in trials if t['rung'] == rung]
+            scored = [t for t in in_rung if t['score'] is not None]
+            if scored and len(in_rung) == self._scheduled[rung].get(family, 0):
+                return max(scored, key=lambda t: t['score'])
+        scored = [t for t in trials if t['score'] is not None]
+        return max(scored, key=lambda t: t['score']) if scored else None
+
+    def _promote(self, rung, survivors):
+        promoted = {}
+        for family, configs in survivors.items():
+            scored = [t for t in self.trace
+                      if t['rung'] == rung and t['family'] == family and t['score'] is not None]
+            scored.sort(key=lambda t: t['score'], reverse=True)
+            keep = max(1, len(configs) // self.eta)
+            promoted[family] = [t['params'] for t in scored[:keep]]
+        return promoted
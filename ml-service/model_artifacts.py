@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import types
+import time
+import shutil
+import logging
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+MANIFEST = "manifest.json"
+ARTIFACT_SUFFIX = ".model"
+
+def _trees(model: Any) -> List[Any]:
+    """Estimators holding a tree_ (a single tree or an ensemble's members), in a stable order"""
+    if hasattr(model, 'tree_'):
+        return [model]
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        return []
+    return [est for est in np.ravel(np.asarray(estimators, dtype=object)) if hasattr(est, 'tree_')]
+
+def _compact_column(name: str, column: np.ndarray) -> np.ndarray:
+    """Smallest dtype that keeps a node column's predictions unchanged"""
+    if name == 'threshold':
+        # Trees compare float32-cast inputs, so the largest float32 <= t splits
+        # every input the same way as t itself
+        compact = column.astype(np.float32)
+        above = compact.astype(np.float64) > column
+        compact[above] = np.nextafter(compact[above], np.float32(-np.inf))
+        return compact
+    if column.dtype.kind == 'i':
+        info = np.iinfo(np.int32)
+        if len(column) == 0 or (column.min() >= info.min and column.max() <= info.max):
+            return column.astype(np.int32)
+    elif column.dtype.kind == 'f':
+        compact = column.astype(np.float32)
+        if np.array_equal(compact.astype(column.dtype), column):
+            return compact
+    return column
+
+def _pack_trees(trees: List[Any]) -> Dict[str, np.ndarray]:
+    """Flatten every tree's node table and values into shared columns"""
+    states = [est.tree_.__reduce__()[2] for est in trees]
+    fields = states[0]['nodes'].dtype.names
+    arrays = {
+        'node_counts': np.array([state['node_count'] for state in states], dtype=np.int64),
+        'max_depths': np.array([state['max_depth'] for state in states], dtype=np.int64),
+        'values': np.concatenate([state['values'].reshape(state['node_count'], -1) for state in states]),
+    }
+    for field in fields:
+        column = np.concatenate([state['nodes'][field] for state in states])
+        arrays[f"node_{field}"] = _compact_column(field, column)
+    return arrays
+
+def _unpack_trees(trees: List[Any], tree_args: List[list], arrays: Dict[str, np.ndarray]):
+    from sklearn.tree._tree import Tree, NODE_DTYPE
+
+    offsets = np.concatenate([[0], np.cumsum(arrays['node_counts'])])
+    for i, est in enumerate(trees):
+        start, end = offsets[i], offsets[i + 1]
+        n_features, n_classes, n_outputs = tree_args[i]
+        n_classes = np.asarray(n_classes, dtype=np.intp)
+        nodes = np.empty(end - start, dtype=NODE_DTYPE)
+        for field in NODE_DTYPE.names:
+            nodes[field] = arrays[f"node_{field}"][start:end]
+        tree = Tree(n_features, n_classes, n_outputs)
+        tree.__setstate__({
+            'max_depth': int(arrays['max_depths'][i]),
+            'node_count': int(end - start),
+            'nodes': nodes,
+            'values': np.ascontiguousarray(
+                arrays['values'][start:end].reshape(end - start, n_outputs, -1), dtype=np.float64
+            )
+        })
+        est.tree_ = tree
+
+def _save_model(model: Any, directory: str, compress: int) -> List[str]:
+    """Save an estimator, storing its trees (if any) as compact columns"""
+    trees = _trees(model)
+    if not trees:
+        joblib.dump(model, os.path.join(directory, "model.joblib"), compress=compress)
+        return ["model.joblib"]
+
+    arrays = _pack_trees(trees)
+    tree_args = []
+    originals = []
+    for est in trees:
+        _, (n_features, n_classes, n_outputs), _ = est.tree_.__reduce__()
+        tree_args.append([int(n_features), np.asarray(n_classes).tolist(), int(n_outputs)])
+        originals.append(est.tree_)
+    try:
+        # Pickle the estimator without its trees, then put them back
+        for est in trees:
+            est.tree_ = None
+        joblib.dump({'model': model, 'tree_args': tree_args},
+                    os.path.join(directory, "model.joblib"), compress=compress)
+    finally:
+        for est, tree in zip(trees, originals):
+            est.tree_ = tree
+    if compress:
+        # Smaller on disk, but a compressed archive can only be read whole
+        np.savez_compressed(os.path.join(directory, "trees.npz"), **arrays)
+        return ["model.joblib", "trees.npz"]
+    # One .npy per column, so loading can map them
+    files = []
+    for name, array in arrays.items():
+        files.append(f"trees.{name}.npy")
+        np.save(os.path.join(directory, files[-1]), array)
+    return ["model.joblib"] + files
+
+def _load_model(directory: str, files: List[str]) -> Any:
+    shell = joblib.load(os.path.join(directory, "model.joblib"))
+    if "trees.npz" in files:
+        model = shell['model']
+        with np.load(os.path.join(directory, "trees.npz")) as arrays:
+            _unpack_trees(_trees(model), shell['tree_args'], dict(arrays))
+        return model
+    tree_files = [f for f in files if f.startswith("trees.") and f.endswith(".npy")]
+    if not tree_files:
+        return shell
+    model = shell['model']
+    # Mapped read-only: each tree's rows are paged in as it is rebuilt, so the
+    # columns are never held in memory whole (sklearn copies the node tables)
+    arrays = {f[len("trees."):-len(".npy")]: np.load(os.path.join(directory, f), mmap_mode='r')
+              for f in tree_files}
+    _unpack_trees(_trees(model), shell['tree_args'], arrays)
+    return model
+
+def _is_json_value(value: Any) -> bool:
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def save_artifact(model_data: Dict[str, Any], path: str, compress: int = 0) -> Dict[str, Any]:
+    """
+    Save model data as a directory of separately loadable components
+
+    Plain JSON values go into the manifest; every other entry becomes its
+    own joblib file, except the 'model' whose trees are stored as compact
+    columns (int32 node ids, float32 thresholds rounded so predictions are
+    unchanged). Uncompressed, each column is a .npy file that loading maps
+    read-only; compressed, they share one trees.npz that must be read whole.
+    The directory is written next to path and renamed into place.
+
+    Args:
+        model_data (dict): Entries to save ('model', 'scaler', ...)
+        path (str): Artifact directory to create
+        compress (int): zlib level 0-9 for the component files (0 keeps
+            them uncompressed, which loads fastest and maps the trees)
+
+    Returns:
+        dict: The manifest
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    manifest = {'version': ARTIFACT_VERSION, 'compress': compress, 'values': {}, 'components': {}}
+    for name, value in model_data.items():
+        if name != 'model' and _is_json_value(value):
+            manifest['values'][name] = value
+            continue
+        if name == 'model':
+            files = _save_model(value, tmp_path, compress)
+        else:
+            files = [f"{name}.joblib"]
+            joblib.dump(value, os.path.join(tmp_path, files[0]), compress=compress)
+        manifest['components'][name] = {
+            'files': files,
+            'bytes': sum(os.path.getsize(os.path.join(tmp_path, f)) for f in files)
+        }
+    manifest['total_bytes'] = sum(c['bytes'] for c in manifest['components'].values())
+
+    with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    return manifest
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+class ModelArtifact(Mapping):
+    """
+    Read-only, lazily loaded view of a saved artifact
+
+    Behaves like the model_data dict: artifact['model'] or
+    artifact.get('scaler') loads just that component on first access and
+    keeps it. Load times are recorded per component in load_seconds.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self._components = self.manifest['components']
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self.load_seconds = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self.manifest['values']:
+            return self.manifest['values'][name]
+        if name not in self._components:
+            raise KeyError(name)
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+        with self._lock:
+            if name not in self._loaded:
+                start = time.perf_counter()
+                files = self._components[name]['files']
+                if name == 'model':
+                    value = _load_model(self.path, files)
+                else:
+                    value = joblib.load(os.path.join(self.path, files[0]))
+                self.load_seconds[name] = time.perf_counter() - start
+                self._loaded[name] = value
+            return self._loaded[name]
+
+    def __iter__(self):
+        yield from self.manifest['values']
+        yield from self._components
+
+    def __len__(self) -> int:
+        return len(self.manifest['values']) + len(self._components)
+
+    @property
+    def size_bytes(self) -> int:
+        return self.manifest['total_bytes']
+
+    def report(self) -> Dict[str, Any]:
+        """Per-component size on disk and load time (for components loaded so far)"""
+        return {
+            'total_bytes': self.size_bytes,
+            'compress': self.manifest.get('compress', 0),
+            'components': {
+                name: {'bytes': info['bytes'], 'load_seconds': self.load_seconds.get(name)}
+                for name, info in self._components.items()
+            }
+        }
+
+def load_artifact(path: str, mmap_mode: Optional[str] = 'r') -> Any:
+    """Open an artifact directory lazily, or load a legacy single-file joblib pickle"""
+    if is_artifact(path):
+        return ModelArtifact(path)
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+def artifact_size(path: str) -> int:
+    """Bytes on disk of an artifact directory or a legacy pickle"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def memory_size(obj: Any) -> int:
+    """
+    Approximate bytes a loaded model (or model_data) occupies in memory
+
+    Counts NumPy buffers, every tree's node table and the Python objects
+    holding them. On disk, trees are stored compacted, so artifact_size()
+    understates this. Only the components of a lazy ModelArtifact loaded so
+    far are counted.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        value = stack.pop()
+        if id(value) in seen or isinstance(value, (type, types.ModuleType, types.FunctionType)):
+            continue
+        seen.add(id(value))
+        if isinstance(value, ModelArtifact):
+            stack.extend(list(value._loaded.values()))
+            continue
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+            if value.dtype.hasobject:
+                stack.extend(value.ravel().tolist())
+            continue
+        total += sys.getsizeof(value)
+        if isinstance(value, Mapping):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            stack.extend(value)
+        elif type(value).__name__ == 'Tree' and hasattr(value, '__getstate__'):
+            # sklearn's Cython tree keeps its node table outside __dict__
+            state = value.__getstate__()
+            stack.extend([state['nodes'], state['values']])
+        elif hasattr(value, '__dict__'):
+            stack.append(vars(value))
+    return total
@@ -0,0 +1,193 @@
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+
+from model_artifacts import ModelArtifact, load_artifact, memory_size
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    Serves the models listed in model_metadata.json from a warm LRU cache
+
+    Models are loaded lazily on first use and kept in memory subject to a
+    count and memory budget. A background thread watches the metadata file
+    and atomically swaps in newer artifacts, so the request path never
+    touches the disk once a model is warm.
+    """
+
+    def __init__(self, model_path="models/", max_models=8, memory_budget_mb=1024,
+                 reload_interval=5.0):
+        """
+        Args:
+            model_path (str): Directory holding the artifacts and metadata
+            max_models (int): Maximum number of models kept in memory
+            memory_budget_mb (float): Approximate memory budget for the cache
+            reload_interval (float): Seconds between metadata checks (0 disables)
+        """
+        self.model_path = model_path
+        self.max_models = max_models
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.reload_interval = reload_interval
+
+        self._index = {}
+        # name -> (model_file, model_data, size_bytes)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._metadata_mtime = None
+        self._stop = threading.Event()
+
+        self.refresh()
+        self._start_watcher()
+
+    def _start_watcher(self):
+        if self.reload_interval:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def after_fork(self):
+        """
+        Restart the metadata watcher in a forked child, where it doesn't exist
+
+        Models cached before the fork stay shared with the parent
+        copy-on-write; each process reloads newer artifacts on its own.
+        """
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._stop = threading.Event()
+        self._start_watcher()
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.model_path, "model_metadata.json")
+
+    def _read_metadata(self):
+        with open(self.metadata_path) as f:
+            metadata = json.load(f)
+        if 'models' in metadata:
+            return metadata['models']
+        # Single-model metadata written before named models were tracked
+        if 'model_file' in metadata:
+            return {metadata.get('name', 'best_model'): metadata}
+        return {}
+
+    def _load(self, entry):
+        filepath = os.path.join(self.model_path, entry['model_file'])
+        model_data = load_artifact(filepath)
+        if isinstance(model_data, ModelArtifact):
+            # Warm the components the request path uses so no request pays for them
+            model_data.get('model')
+            model_data.get('scaler')
+        # Budgeted by size once loaded; compact artifacts are smaller on disk
+        return model_data, memory_size(model_data)
+
+    def _evict(self):
+        total = sum(size for _, _, size in self._cache.values())
+        while len(self._cache) > 1 and (len(self._cache) > self.max_models or total > self.memory_budget):
+            name, (_, _, size) = self._cache.popitem(last=False)
+            total -= size
+            logger.info(f"Evicted model '{name}' from cache")
+
+    def refresh(self):
+        """Re-read the metadata if it changed and reload any cached model that has a newer artifact"""
+        try:
+            mtime = os.stat(self.metadata_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._metadata_mtime:
+            return
+
+        try:
+            index = self._read_metadata()
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading model metadata: {e}")
+            return
+
+        with self._lock:
+            self._index = index
+            self._metadata_mtime = mtime
+            stale = [
+                name for name, (model_file, _, _) in self._cache.items()
+                if name not in index or index[name]['model_file'] != model_file
+            ]
+
+        for name in stale:
+            entry = index.get(name)
+            if entry is None:
+                with self._lock:
+                    self._cache.pop(name, None)
+                continue
+            try:
+                model_data, size = self._load(entry)
+            except Exception as e:
+                logger.error(f"Error reloading model '{name}': {e}")
+                continue
+            # Swap the whole entry at once; requests see the old or the new model
+            with self._lock:
+                self._cache[name] = (entry['model_file'], model_data, size)
+                self._evict()
+            logger.info(f"Reloaded model '{name}' from {entry['model_file']}")
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.refresh()
+
+    def get(self, name):
+        """
+        Get a model by name
+
+        Args:
+            name (str): Model name from model_metadata.json
+
+        Returns:
+            dict: The saved model data ('model', 'scaler', ...) or None
+        """
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None:
+                self._cache.move_to_end(name)
+                return cached[1]
+            entry = self._index.get(name)
+            if entry is None:
+                return None
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # One loader per model; concurrent callers wait for it
+        with load_lock:
+            with self._lock:
+                cached = self._cache.get(name)
+                if cached is not None:
+                    return cached[1]
+            try:
+                model_data, size = self._load(entry)
+            except Exception as e:
+                logger.error(f"Error loading model '{name}': {e}")
+                return None
+            with self._lock:
+                # Don't cache an artifact that a concurrent refresh superseded
+                current = self._index.get(name)
+                if current is not None and current['model_file'] == entry['model_file']:
+                    self._cache[name] = (entry['model_file'], model_data, size)
+                    self._evict()
+            logger.info(f"Loaded model '{name}' from {entry['model_file']}")
+            return model_data
+
+    def warm(self, names):
+        """Load the given models ahead of the first request"""
+        for name in names:
+            self.get(name)
+
+    def status(self):
+        """Models listed in the metadata and those currently in memory"""
+        with self._lock:
+            return {
+                'available': {name: entry.get('model_file') for name, entry in self._index.items()},
+                'cached': {name: {'model_file': model_file, 'size_bytes': size}
+                           for name, (model_file, _, size) in self._cache.items()}
+            }
+
+    def close(self):
+        self._stop.set()
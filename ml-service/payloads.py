@@ -0,0 +1,160 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+NPY_CONTENT_TYPE = 'application/x-npy'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+class PayloadError(ValueError):
+    """Raised when a request body cannot be turned into a feature matrix"""
+
+def _from_npy(body):
+    matrix = np.load(io.BytesIO(body), allow_pickle=False)
+    if matrix.ndim != 2:
+        raise PayloadError(f"Expected a 2-D .npy array, got {matrix.ndim} dimensions")
+    return matrix
+
+def _from_arrow(body):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise PayloadError("Arrow payloads require pyarrow to be installed")
+    table = pa.ipc.open_stream(body).read_all()
+    columns = [column.to_numpy() for column in table.columns]
+    return columns, table.column_names
+
+def _check_schema(names, schema):
+    schema = list(schema)
+    if sorted(map(str, names)) != sorted(map(str, schema)):
+        raise PayloadError(f"Features {list(names)} do not match model schema {schema}")
+    return schema
+
+def align_to_schema(matrix, names, schema):
+    """
+    Reorder the columns of a feature matrix into the model's schema order
+
+    Args:
+        matrix (ndarray): Feature matrix with columns named by names
+        names (list): Current column names
+        schema (list): Feature names the model was trained on, if any
+
+    Returns:
+        tuple: (matrix, feature_names)
+    """
+    if schema is None:
+        return matrix, list(names)
+    schema = _check_schema(names, schema)
+    index = {str(name): i for i, name in enumerate(names)}
+    return matrix[:, [index[str(name)] for name in schema]], schema
+
+def parse_entity_ids(entity_ids):
+    """
+    Validate the entity ids of a /detect request served from the feature store
+
+    Returns:
+        list: The ids, one row to score per id
+    """
+    if not isinstance(entity_ids, list) or not entity_ids:
+        raise PayloadError("entity_ids must be a non-empty list")
+    for entity_id in entity_ids:
+        # bool is an int subclass, but never a user id
+        if isinstance(entity_id, bool) or not isinstance(entity_id, (str, int)):
+            raise PayloadError(f"entity_ids must be strings or integers, got {entity_id!r}")
+    return entity_ids
+
+def parse_features(request, schema=None):
+    """
+    Turn a request body into a contiguous float matrix in schema order
+
+    Accepted bodies:
+      - JSON {"features": {"col": [...], ...}}: columnar, equal-length arrays
+      - JSON {"features": [{"col": v, ...}, ...]}: one dict per row
+      - JSON {"features": [[v, ...], ...]}: one list per row, columns in
+        schema order
+      - application/x-npy: a 2-D array, columns in schema order (or named
+        by a comma-separated X-Feature-Names header)
+      - application/vnd.apache.arrow.stream: an Arrow IPC stream
+
+    Args:
+        request: Flask request
+        schema (list): Feature names the model was trained on, if any
+
+    Returns:
+        tuple: (matrix, feature_names, columnar) where columnar tells the
+            caller to answer with columnar arrays instead of row dicts
+
+    Raises:
+        PayloadError: The body is missing, malformed or not numeric
+    """
+    try:
+        return _parse_features(request, schema)
+    except PayloadError:
+        raise
+    except (TypeError, ValueError, EOFError) as e:
+        raise PayloadError(f"Invalid features: {e}")
+
+def _positional_names(n_columns, names):
+    """Names for columns given by position: the header's or schema's, else f0, f1, ..."""
+    if names is None:
+        return [f"f{i}" for i in range(n_columns)]
+    if len(names) != n_columns:
+        raise PayloadError(f"Got {n_columns} feature columns, expected {len(names)}")
+    return list(names)
+
+def _parse_features(request, schema):
+    content_type = (request.mimetype or '').lower()
+    header = request.headers.get('X-Feature-Names')
+    header_names = [name.strip() for name in header.split(',')] if header else None
+
+    if content_type == NPY_CONTENT_TYPE:
+        matrix = _from_npy(request.get_data())
+        names = _positional_names(matrix.shape[1], header_names or schema)
+        columns = [matrix[:, i] for i in range(matrix.shape[1])]
+        columnar = True
+    elif content_type == ARROW_CONTENT_TYPE:
+        columns, names = _from_arrow(request.get_data())
+        columnar = True
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or 'features' not in data:
+            raise PayloadError("Missing required features data")
+        features = data['features']
+        if isinstance(features, dict):
+            names = list(features.keys())
+            columns = [np.asarray(column, dtype=np.float64) for column in features.values()]
+            if any(column.ndim != 1 for column in columns):
+                raise PayloadError("Columnar features must be arrays of numbers")
+            columnar = True
+        elif isinstance(features, list) and features and all(isinstance(row, list) for row in features):
+            matrix = np.asarray(features, dtype=np.float64)
+            if matrix.ndim != 2:
+                raise PayloadError("Row features must all have the same length")
+            names = _positional_names(matrix.shape[1], schema)
+            columns = [matrix[:, i] for i in range(matrix.shape[1])]
+            columnar = False
+        elif isinstance(features, list) and all(isinstance(row, dict) for row in features):
+            frame = pd.DataFrame(features)
+            names = list(frame.columns)
+            columns = [frame[name].to_numpy() for name in names]
+            columnar = False
+        else:
+            raise PayloadError("features must be an object of columns or a list of rows")
+
+    if len(names) != len(columns):
+        raise PayloadError(f"Got {len(names)} feature names for {len(columns)} columns")
+    lengths = {len(column) for column in columns}
+    if len(lengths) > 1:
+        raise PayloadError("All feature columns must have the same length")
+
+    if schema is not None:
+        schema = _check_schema(names, schema)
+        by_name = dict(zip(map(str, names), columns))
+        columns = [by_name[str(name)] for name in schema]
+        names = schema
+
+    n_rows = lengths.pop() if lengths else 0
+    matrix = np.empty((n_rows, len(columns)), dtype=np.float64)
+    for i, column in enumerate(columns):
+        matrix[:, i] = column
+    return matrix, list(names), columnar
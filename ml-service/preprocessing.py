@@ -4,34 +4,173 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 import warnings
 
+from column_stats import ColumnStatistics
+from data_loading import DatasetLoader
+from encoding import HashingEncoder
+
 warnings.filterwarnings('ignore')
 
+class CompiledTransform:
+    """
+    Fitted preprocessing state flattened into arrays for inference
+
+    Holds the fit-time fill values, a category -> code table per encoded
+    column and the scaler's shift/scale vectors, so raw records become a
+    scaled float matrix in a single pass without refitting anything.
+    """
+    
+    def __init__(self, columns, fill_values, categories, mean, scale, hashers=None):
+        self.columns = list(columns)
+        self.categories = categories
+        self.hashers = hashers or {}
+        # Categorical fill values are stored as their encoded codes
+        self.fill = np.array([
+            categories[col].get(str(fill_values.get(col)), np.nan) if col in categories
+            else self.hashers[col].transform_value(str(fill_values.get(col))) if col in self.hashers
+            else fill_values.get(col, np.nan)
+            for col in self.columns
+        ], dtype=np.float64)
+        self.inv_scale = 1.0 / np.asarray(scale, dtype=np.float64)
+        self.shift = np.asarray(mean, dtype=np.float64) * self.inv_scale
+    
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """Compile the fitted state of a DataPreprocessor"""
+        scaler = preprocessor.scaler
+        columns = preprocessor.feature_columns or list(scaler.feature_names_in_)
+        encoders = {col: le for col, le in preprocessor.label_encoders.items() if col in columns}
+        hashers = {col: le for col, le in encoders.items() if isinstance(le, HashingEncoder)}
+        categories = {
+            col: {label: code for code, label in enumerate(le.classes_)}
+            for col, le in encoders.items() if col not in hashers
+        }
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(columns))
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(columns))
+        return cls(columns, preprocessor.fill_values, categories, mean, scale, hashers)
+    
+    def _encode(self, col, value):
+        try:
+            return self.categories[col][str(value)]
+        except KeyError:
+            raise ValueError(f"Unseen label {value!r} in column '{col}'")
+    
+    def transform_record(self, record):
+        """Fast path: transform a single dict record into a 1-D scaled vector"""
+        row = np.empty(len(self.columns), dtype=np.float64)
+        for i, col in enumerate(self.columns):
+            value = record.get(col)
+            if value is None or (isinstance(value, float) and value != value):
+                row[i] = self.fill[i]
+            elif col in self.categories:
+                row[i] = self._encode(col, value)
+            elif col in self.hashers:
+                row[i] = self.hashers[col].transform_value(str(value))
+            else:
+                row[i] = value
+        row *= self.inv_scale
+        row -= self.shift
+        return row
+    
+    def transform(self, data):
+        """
+        Transform raw records into a scaled float matrix
+        
+        Args:
+            data: DataFrame, list of dict records or a single dict record
+        
+        Returns:
+            ndarray: (n_rows, n_features) scaled matrix in fit column order
+        """
+        if isinstance(data, dict):
+            return self.transform_record(data).reshape(1, -1)
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(data)
+        
+        matrix = np.empty((len(data), len(self.columns)), dtype=np.float64)
+        for i, col in enumerate(self.columns):
+            if col not in data.columns:
+                matrix[:, i] = np.nan
+                continue
+            values = data[col]
+            if col in self.categories:
+                missing = values.isna().to_numpy()
+                codes = values.astype(str).map(self.categories[col]).to_numpy(dtype=np.float64)
+                unseen = np.isnan(codes) & ~missing
+                if unseen.any():
+                    raise ValueError(f"Unseen labels {list(values[unseen].unique())} in column '{col}'")
+                matrix[:, i] = codes
+            elif col in self.hashers:
+                codes = self.hashers[col].transform(values).astype(np.float64)
+                codes[values.isna().to_numpy()] = np.nan
+                matrix[:, i] = codes
+            else:
+                matrix[:, i] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        # Fill, shift and scale in place over the whole matrix
+        rows, cols = np.nonzero(np.isnan(matrix))
+        matrix[rows, cols] = self.fill[cols]
+        matrix *= self.inv_scale
+        matrix -= self.shift
+        return matrix
+
 class DataPreprocessor:
-    def __init__(self):
+    def __init__(self, categorical_encoding='label', hash_buckets=2**20):
+        """
+        Args:
+            categorical_encoding (str): 'label' fits a LabelEncoder per column;
+                'hash' uses a HashingEncoder (no vocabulary, unseen values allowed)
+            hash_buckets (int): Number of buckets for the 'hash' encoding
+        """
+        if categorical_encoding not in ('label', 'hash'):
+            raise ValueError(f"Unknown categorical encoding: {categorical_encoding}")
+        self.categorical_encoding = categorical_encoding
+        self.hash_buckets = hash_buckets
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        self.fill_values = {}
+        self.feature_columns = None
+        self.compiled_transform = None
+        self.loader = DatasetLoader()
         
-    def load_data(self, file_path):
-        """Load data from CSV file"""
+    def load_data(self, file_path, sample_size=None):
+        """Load data from CSV file, optionally as a uniform sample of sample_size rows"""
         try:
-            data = pd.read_csv(file_path)
+            data = self.loader.load(file_path, sample_size=sample_size)
             return data
         except Exception as e:
             print(f"Error loading data: {e}")
             return None
     
-    def handle_missing_values(self, df):
-        """Handle missing values in the dataset"""
-        # Fill numerical columns with median
-        numerical_cols = df.select_dtypes(include=[np.number]).columns
-        df[numerical_cols] = df[numerical_cols].fillna(df[numerical_cols].median())
-        
-        # Fill categorical columns with mode
-        categorical_cols = df.select_dtypes(include=['object']).columns
-        for col in categorical_cols:
-            df[col] = df[col].fillna(df[col].mode()[0] if not df[col].mode().empty else 'Unknown')
-        
-        return df
+    def fit_fill_values(self, data):
+        """
+        Compute missing-value fill values in one scan
+        
+        Args:
+            data: DataFrame (exact statistics) or an iterable of DataFrame
+                chunks, e.g. DatasetLoader.iter_chunks (streaming approximations)
+        
+        Returns:
+            dict: Column -> fill value (median for numeric, mode otherwise)
+        """
+        stats = ColumnStatistics(numeric_strategy='median')
+        if isinstance(data, pd.DataFrame):
+            stats.fit(data)
+        else:
+            for chunk in data:
+                stats.partial_fit(chunk)
+        self.fill_values = stats.fill_values
+        return self.fill_values
+    
+    def handle_missing_values(self, df, fill_values=None):
+        """Handle missing values in the dataset, with precomputed fill_values if given"""
+        if fill_values is None:
+            self.fit_fill_values(df)
+        else:
+            self.fill_values = dict(fill_values)
+        
+        stats = ColumnStatistics()
+        stats.fill_values = self.fill_values
+        return stats.transform(df)
     
     def encode_categorical_features(self, df, categorical_columns):
         """Encode categorical features"""
@@ -39,8 +178,12 @@ class DataPreprocessor:
         
         for col in categorical_columns:
             if col in df_encoded.columns:
-                le = LabelEncoder()
-                df_encoded[col] = le.fit_transform(df_encoded[col].astype(str))
+                if self.categorical_encoding == 'hash':
+                    le = HashingEncoder(self.hash_buckets)
+                    df_encoded[col] = le.fit_transform(df_encoded[col])
+                else:
+                    le = LabelEncoder()
+                    df_encoded[col] = le.fit_transform(df_encoded[col].astype(str))
                 self.label_encoders[col] = le
         
         return df_encoded
@@ -59,10 +202,10 @@ class DataPreprocessor:
         """Split data into training and testing sets"""
         return train_test_split(X, y, test_size=test_size, random_state=random_state)
     
-    def preprocess_pipeline(self, data, target_column, categorical_columns=None):
+    def preprocess_pipeline(self, data, target_column, categorical_columns=None, fill_values=None):
         """Complete preprocessing pipeline"""
-        # Handle missing values
-        data_clean = self.handle_missing_values(data)
+        # Handle missing values (fill_values from fit_fill_values over the full dataset, if given)
+        data_clean = self.handle_missing_values(data, fill_values)
         
         # Separate features and target
         X = data_clean.drop(columns=[target_column])
@@ -78,20 +221,24 @@ class DataPreprocessor:
         # Scale features
         X_train_scaled, X_test_scaled = self.scale_features(X_train, X_test)
         
+        # Freeze the fitted state for inference
+        self.feature_columns = list(X.columns)
+        self.compiled_transform = self.compile()
+        
         return X_train_scaled, X_test_scaled, y_train, y_test
     
+    def compile(self):
+        """Compile the fitted preprocessing state into a CompiledTransform"""
+        return CompiledTransform.from_preprocessor(self)
+    
     def transform_new_data(self, new_data, categorical_columns=None):
-        """Transform new data using fitted preprocessors"""
-        # Handle missing values
-        new_data_clean = self.handle_missing_values(new_data)
-        
-        # Encode categorical features
-        if categorical_columns:
-            for col in categorical_columns:
-                if col in new_data_clean.columns and col in self.label_encoders:
-                    new_data_clean[col] = self.label_encoders[col].transform(new_data_clean[col].astype(str))
-        
-        # Scale features
-        new_data_scaled = self.scaler.transform(new_data_clean)
+        """
+        Transform new data using fitted preprocessors
         
-        return new_data_scaled
\ No newline at end of file
+        Missing values are filled with the statistics captured at fit time
+        and categories are encoded with the fitted encoders, so
+        categorical_columns is only kept for backwards compatibility.
+        """
+        if self.compiled_transform is None:
+            self.compiled_transform = self.compile()
+        return self.compiled_transform.transform(new_data)
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached layout or preprocessing semantics change
+CACHE_VERSION = 1
+
+class PreprocessingCache:
+    """
+    Content-addressed cache of preprocessed training arrays
+
+    An entry is keyed by the input file's content hash plus the
+    preprocessing parameters, and holds X/y as .npy files (loaded back
+    memory-mapped, without copying) and the fitted transformers as a
+    joblib file. File digests are remembered by (path, size, mtime) so an
+    unchanged file is not re-read just to hash it. Least recently used
+    entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 10 * 2**30):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache entries
+            max_bytes (int): Total size above which old entries are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def _digest_index_path(self) -> str:
+        return os.path.join(self.cache_dir, "digests.json")
+
+    def file_digest(self, filepath: str) -> str:
+        """SHA-256 of a file's content, reused while its size and mtime are unchanged"""
+        stat = os.stat(filepath)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        path = os.path.abspath(filepath)
+        with self._lock:
+            try:
+                with open(self._digest_index_path) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+            known = index.get(path)
+            if known and known[:2] == signature:
+                return known[2]
+
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 2**20), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+
+        with self._lock:
+            index[path] = signature + [digest]
+            tmp_path = f"{self._digest_index_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._digest_index_path)
+        return digest
+
+    def key(self, filepath: str, params: Dict[str, Any]) -> str:
+        """Cache key for a file's content and the preprocessing parameters"""
+        payload = json.dumps(
+            {'version': CACHE_VERSION, 'file': self.file_digest(filepath), 'params': params},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray, Dict[str, Any]]]:
+        """
+        Look up an entry
+
+        Returns:
+            tuple: (X, y, state) with X and y memory-mapped read-only, or None
+        """
+        entry = self._entry_dir(key)
+        try:
+            X = np.load(os.path.join(entry, "X.npy"), mmap_mode='r')
+            y = np.load(os.path.join(entry, "y.npy"), mmap_mode='r')
+            state = joblib.load(os.path.join(entry, "state.joblib"))
+        except (OSError, ValueError) as e:
+            if os.path.exists(entry):
+                logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+                shutil.rmtree(entry, ignore_errors=True)
+            return None
+        # The directory mtime is the entry's last use, for eviction
+        os.utime(entry)
+        return X, y, state
+
+    def put(self, key: str, X: np.ndarray, y: np.ndarray, state: Dict[str, Any]) -> bool:
+        """Store an entry atomically, then evict old entries beyond max_bytes"""
+        entry = self._entry_dir(key)
+        tmp = tempfile.mkdtemp(prefix=f".{key[:12]}_", dir=self.cache_dir)
+        try:
+            np.save(os.path.join(tmp, "X.npy"), np.ascontiguousarray(X), allow_pickle=False)
+            np.save(os.path.join(tmp, "y.npy"), np.ascontiguousarray(y), allow_pickle=False)
+            joblib.dump(state, os.path.join(tmp, "state.joblib"))
+            with self._lock:
+                if os.path.exists(entry):
+                    shutil.rmtree(tmp)
+                else:
+                    os.rename(tmp, entry)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not cache preprocessed data: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        self.evict()
+        return True
+
+    @staticmethod
+    def _size(path: str) -> int:
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if not os.path.isdir(path):
+                    continue
+                mtime = os.stat(path).st_mtime
+                if name.startswith('.'):
+                    # Leftover from a writer that died mid-put
+                    if time.time() - mtime > 86400:
+                        shutil.rmtree(path, ignore_errors=True)
+                    continue
+                entries.append((mtime, self._size(path), path))
+            total = sum(size for _, size, _ in entries)
+            # Always keep the most recent entry, even if it alone exceeds the budget
+            for _, size, path in sorted(entries)[:-1]:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                logger.info(f"Evicted preprocessing cache entry {os.path.basename(path)}")
+
+    def status(self) -> Dict[str, Any]:
+        """Entries currently cached and their total size"""
+        sizes = {
+            name: self._size(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir)
+            if os.path.isdir(os.path.join(self.cache_dir, name)) and not name.startswith('.')
+        }
+        return {'entries': len(sizes), 'total_bytes': sum(sizes.values())}
@@ -0,0 +1,91 @@
+import time
+import logging
+import resource
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+def _status_kb(field: str) -> Optional[int]:
+    """A memory field (e.g. VmRSS, VmHWM) from /proc/self/status in kB (Linux only)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reset_peak() -> bool:
+    """Reset the process's peak RSS (VmHWM) so the next reading covers only what follows"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+# Open stages of every profiler in this process: resetting the peak for one
+# stage must not hide what enclosing stages (of any profiler) have seen
+_open_stages = []
+
+def _peak_kb() -> int:
+    peak = _status_kb('VmHWM')
+    # ru_maxrss is the lifetime peak: an upper bound where VmHWM can't be reset
+    return peak if peak is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class StageProfiler:
+    """
+    Records wall time, CPU time and peak memory for named pipeline stages
+
+    Stages nest, also across profilers in one process; an outer stage's
+    peak includes its inner stages. Peak memory is the process's RSS
+    high-water mark over the stage, reset at the start of each stage where
+    the kernel allows it. Results are plain dicts, ready to be written into
+    model_metadata.json.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time and measure the enclosed block as stage `name`"""
+        if _open_stages:
+            # Fold the peak so far into the enclosing stage before resetting it
+            _open_stages[-1]['peak_kb'] = max(_open_stages[-1]['peak_kb'], _peak_kb())
+        frame = {'peak_kb': 0, 'exact_peak': _reset_peak()}
+        rss_start = _status_kb('VmRSS') or 0
+        wall, cpu = time.perf_counter(), time.process_time()
+        _open_stages.append(frame)
+        try:
+            yield
+        finally:
+            _open_stages.pop()
+            peak_kb = max(frame['peak_kb'], _peak_kb())
+            if _open_stages:
+                _open_stages[-1]['peak_kb'] = max(_open_stages[-1]['peak_kb'], peak_kb)
+            self.stages[name] = {
+                'wall_seconds': round(time.perf_counter() - wall, 4),
+                'cpu_seconds': round(time.process_time() - cpu, 4),
+                'rss_start_mb': round(rss_start / 1024, 1),
+                'peak_rss_mb': round(peak_kb / 1024, 1),
+                'peak_increase_mb': round(max(peak_kb - rss_start, 0) / 1024, 1),
+                'exact_peak': frame['exact_peak']
+            }
+
+    def record(self, name: str, stats: Dict[str, Any]):
+        """Add stats measured elsewhere (e.g. in a worker process)"""
+        self.stages[name] = stats
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self.stages)
+
+    def log_summary(self):
+        for name, stats in self.stages.items():
+            if 'wall_seconds' in stats:
+                logger.info(
+                    f"{name}: {stats['wall_seconds']:.2f}s wall, {stats['cpu_seconds']:.2f}s CPU, "
+                    f"peak {stats.get('peak_rss_mb', 0):.0f} MB (+{stats.get('peak_increase_mb', 0):.0f} MB)"
+                )
@@ -0,0 +1,271 @@
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class RetrainingManager:
+    """
+    Background sliding-window retraining for the anomaly detector
+
+    Recent feature batches are kept in a bounded ring buffer. A worker thread
+    refits the detector when a job is requested, on a fixed schedule, or when
+    the observed anomaly rate drifts away from the expected contamination.
+    Scheduled and drift jobs train on the buffered window; a job requested
+    with its own data trains on exactly that data. The detector swaps the new
+    model in atomically, so detection never blocks on or observes a partially
+    trained model.
+    """
+
+    # Finished jobs whose outcome is kept for wait()
+    _KEEP_RESULTS = 64
+
+    def __init__(self, detector, window_rows=100000, interval_seconds=0,
+                 drift_threshold=0.0, expected_rate=None, min_rows=256,
+                 on_success=None):
+        """
+        Args:
+            detector (AnomalyDetector): Detector to retrain
+            window_rows (int): Maximum number of buffered rows to train on
+            interval_seconds (float): Retrain on this schedule (0 disables)
+            drift_threshold (float): Retrain when the smoothed anomaly rate
+                differs from expected_rate by more than this (0 disables)
+            expected_rate (float): Anomaly rate the current model targets
+            min_rows (int): Minimum buffered rows for scheduled or drift retraining
+            on_success (callable): Called after a model is swapped in
+        """
+        self.detector = detector
+        self.window_rows = window_rows
+        self.interval_seconds = interval_seconds
+        self.drift_threshold = drift_threshold
+        self.expected_rate = expected_rate
+        self.min_rows = min_rows
+        self.on_success = on_success
+
+        self._batches = deque()
+        self._buffered_rows = 0
+        self._buffer_lock = threading.Lock()
+
+        self._observed_rate = None
+        self._rows_since_retrain = 0
+        self._drift_requested = False
+
+        # Queued (job_id, trigger, data) tuples; the condition also guards
+        # the job counters, status and results
+        self._jobs = deque()
+        self._job_lock = threading.Condition()
+        self._last_job_id = 0
+        self._completed_job_id = 0
+        self._results = OrderedDict()
+        self.status = {
+            'state': 'idle',
+            'job_id': None,
+            'trigger': None,
+            'started_at': None,
+            'finished_at': None,
+            'duration_seconds': None,
+            'rows': None,
+            'error': None,
+            'completed_jobs': 0
+        }
+
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    @property
+    def enabled(self):
+        """Whether scheduled or drift retraining needs recent traffic buffered"""
+        drift = bool(self.drift_threshold) and self.expected_rate is not None
+        return bool(self.interval_seconds) or drift
+
+    def after_fork(self):
+        """
+        Restart the worker thread in a forked child, where it doesn't exist
+
+        Each process then buffers and retrains on its own traffic.
+        """
+        self._buffer_lock = threading.Lock()
+        self._job_lock = threading.Condition()
+        # Jobs queued in the parent are the parent's to run
+        self._jobs = deque()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def add_batch(self, frame):
+        """
+        Append a feature batch to the sliding window
+
+        Args:
+            frame (DataFrame): Feature rows
+        """
+        if frame.empty:
+            return
+        with self._buffer_lock:
+            # A new feature set (e.g. after /train changed it) starts a new window
+            if self._batches and not self._batches[-1].columns.equals(frame.columns):
+                self._batches.clear()
+                self._buffered_rows = 0
+            self._batches.append(frame)
+            self._buffered_rows += len(frame)
+            # Evict whole batches from the oldest end, keeping at least one
+            while self._buffered_rows > self.window_rows and len(self._batches) > 1:
+                self._buffered_rows -= len(self._batches.popleft())
+
+    def observe(self, anomalies):
+        """
+        Track the anomaly rate of scored rows and trigger retraining on drift
+
+        Args:
+            anomalies (ndarray): Boolean anomaly flags from a detection call
+        """
+        if not self.drift_threshold or self.expected_rate is None or len(anomalies) == 0:
+            return
+
+        batch_rate = float(np.count_nonzero(anomalies)) / len(anomalies)
+        weight = min(1.0, len(anomalies) / self.min_rows)
+        with self._buffer_lock:
+            if self._observed_rate is None:
+                self._observed_rate = batch_rate
+            else:
+                self._observed_rate += weight * (batch_rate - self._observed_rate)
+            self._rows_since_retrain += len(anomalies)
+            drifted = (not self._drift_requested and
+                       self._rows_since_retrain >= self.min_rows and
+                       abs(self._observed_rate - self.expected_rate) > self.drift_threshold)
+            # One job per drift; cleared once a retrained model is in place
+            if drifted:
+                self._drift_requested = True
+            observed_rate = self._observed_rate
+
+        if drifted:
+            logger.info(f"Anomaly rate drifted to {observed_rate:.3f}, scheduling retraining")
+            self.request('drift')
+
+    def request(self, trigger='manual', data=None):
+        """
+        Schedule a retraining job
+
+        Args:
+            trigger (str): Reason recorded in the job status
+            data (DataFrame): Train on exactly these rows instead of the
+                buffered window
+
+        Returns:
+            int: Id of the job. A window job requested while another is still
+                queued joins it, since it will include the same batches.
+        """
+        with self._job_lock:
+            if data is None:
+                for job_id, _, queued_data in self._jobs:
+                    if queued_data is None:
+                        return job_id
+            self._last_job_id += 1
+            job_id = self._last_job_id
+            self._jobs.append((job_id, trigger, data))
+            self._job_lock.notify_all()
+        return job_id
+
+    def wait(self, job_id, timeout=None):
+        """
+        Block until the given job has finished
+
+        Returns:
+            dict: Final status of the job, or None on timeout
+        """
+        with self._job_lock:
+            if not self._job_lock.wait_for(lambda: self._completed_job_id >= job_id, timeout):
+                return None
+            return dict(self._results.get(job_id, {'job_id': job_id, 'state': 'unknown', 'error': None}))
+
+    def get_status(self):
+        """Snapshot of the current or most recent job"""
+        with self._job_lock:
+            status = dict(self.status)
+        with self._buffer_lock:
+            status['buffered_rows'] = self._buffered_rows
+            status['observed_anomaly_rate'] = self._observed_rate
+        return status
+
+    def _next_job(self):
+        with self._job_lock:
+            while True:
+                if not self._jobs:
+                    self._job_lock.wait_for(lambda: self._jobs, self.interval_seconds or None)
+                if self._jobs:
+                    return self._jobs.popleft()
+                # The interval passed with nothing requested
+                with self._buffer_lock:
+                    rows = self._buffered_rows
+                if rows >= self.min_rows:
+                    self._last_job_id += 1
+                    return self._last_job_id, 'schedule', None
+                # Too little traffic yet; not worth a failed job every interval
+                logger.debug(f"Skipping scheduled retraining, {rows} of {self.min_rows} rows buffered")
+
+    def _run(self):
+        while True:
+            job_id, trigger, data = self._next_job()
+            self._retrain(job_id, trigger, data)
+
+    def _retrain(self, job_id, trigger, data):
+        if data is None:
+            with self._buffer_lock:
+                batches = list(self._batches)
+                rows = self._buffered_rows
+        else:
+            batches, rows = [data], len(data)
+
+        with self._job_lock:
+            self.status.update({
+                'state': 'running',
+                'job_id': job_id,
+                'trigger': trigger,
+                'started_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'duration_seconds': None,
+                'rows': rows,
+                'error': None
+            })
+        start = time.perf_counter()
+
+        try:
+            # Explicit requests train on whatever they were given
+            required = 1 if trigger == 'manual' else self.min_rows
+            if rows < required:
+                raise ValueError(f"Need at least {required} rows, have {rows}")
+            frame = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+            if not self.detector.train(frame):
+                raise RuntimeError("Failed to train model")
+            with self._buffer_lock:
+                self._observed_rate = None
+                self._rows_since_retrain = 0
+                self._drift_requested = False
+            if self.on_success:
+                self.on_success()
+            state, error = 'succeeded', None
+        except Exception as e:
+            logger.error(f"Background retraining failed: {e}")
+            state, error = 'failed', str(e)
+
+        with self._job_lock:
+            if trigger == 'drift' and state == 'failed':
+                # Let the next drift check try again
+                with self._buffer_lock:
+                    self._drift_requested = False
+            self.status.update({
+                'state': state,
+                'finished_at': datetime.now().isoformat(),
+                'duration_seconds': time.perf_counter() - start,
+                'error': error,
+                'completed_jobs': self.status['completed_jobs'] + 1
+            })
+            self._results[job_id] = dict(self.status)
+            while len(self._results) > self._KEEP_RESULTS:
+                self._results.popitem(last=False)
+            self._completed_job_id = job_id
+            self._job_lock.notify_all()
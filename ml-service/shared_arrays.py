@@ -0,0 +1,27 @@
+import os
+from typing import List, Sequence
+
+import numpy as np
+
+def share_arrays(directory: str, arrays: Sequence[np.ndarray], prefix: str = "array") -> List[str]:
+    """
+    Write arrays once as .npy files so worker processes can map them
+
+    Args:
+        directory (str): Directory to write into (e.g. a TemporaryDirectory)
+        arrays (list): Arrays to share
+        prefix (str): File name prefix
+
+    Returns:
+        list: One path per array, in order
+    """
+    paths = []
+    for i, array in enumerate(arrays):
+        path = os.path.join(directory, f"{prefix}_{i}.npy")
+        np.save(path, np.asarray(array))
+        paths.append(path)
+    return paths
+
+def load_arrays(arrays: Sequence) -> List[np.ndarray]:
+    """Map shared .npy paths read-only; arrays that are already in memory pass through"""
+    return [np.load(a, mmap_mode='r') if isinstance(a, str) else a for a in arrays]
@@ -1,40 +1,73 @@
 import os
+import copy
 import json
 import pickle
+import cProfile
 import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, Tuple, Optional
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, BaseEnsemble
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import joblib
+
+from column_stats import ColumnStatistics
+from data_loading import DatasetLoader
+from encoding import HashingEncoder
+from hyperparameter_search import SuccessiveHalvingSearch
+from model_artifacts import ARTIFACT_SUFFIX, save_artifact, load_artifact
+from preprocessing_cache import PreprocessingCache
+from profiling import StageProfiler
+from shared_arrays import share_arrays, load_arrays
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ModelTrainer:
-    def __init__(self, data_path: str = "data/", model_path: str = "models/"):
+    def __init__(self, data_path: str = "data/", model_path: str = "models/",
+                 categorical_encoding: str = "label", hash_buckets: int = 2**20,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 10 * 2**30):
+        if categorical_encoding not in ('label', 'hash'):
+            raise ValueError(f"Unknown categorical encoding: {categorical_encoding}")
         self.data_path = data_path
         self.model_path = model_path
+        self.categorical_encoding = categorical_encoding
+        self.hash_buckets = hash_buckets
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
+        self.feature_encoders = {}
+        self.fill_values = {}
+        self.feature_columns = []
+        self.feature_fill = None
         self.model = None
         self.best_model = None
         self.best_score = 0.0
+        self.best_model_name = None
+        self.search_results = None
+        self.lineage = []
+        self.profiler = StageProfiler()
+        self.loader = DatasetLoader()
         
         # Create directories if they don't exist
         os.makedirs(self.model_path, exist_ok=True)
         
-    def load_data(self, filename: str) -> pd.DataFrame:
-        """Load data from CSV file"""
+        # Preprocessed arrays are cached next to the models unless told otherwise
+        self.cache = PreprocessingCache(
+            cache_dir or os.path.join(self.model_path, "preprocessing_cache"), cache_max_bytes
+        )
+        
+    def load_data(self, filename: str, sample_size: Optional[int] = None,
+                  on_chunk=None) -> pd.DataFrame:
+        """Load data from CSV file, optionally as a uniform sample of sample_size rows"""
         try:
             filepath = os.path.join(self.data_path, filename)
-            data = pd.read_csv(filepath)
+            data = self.loader.load(filepath, sample_size=sample_size, on_chunk=on_chunk)
             logger.info(f"Data loaded successfully from {filepath}")
             logger.info(f"Data shape: {data.shape}")
             return data
@@ -42,28 +75,44 @@ class ModelTrainer:
             logger.error(f"Error loading data: {e}")
             raise
     
-    def preprocess_data(self, data: pd.DataFrame, target_column: str) -> Tuple[np.ndarray, np.ndarray]:
+    def preprocess_data(self, data: pd.DataFrame, target_column: str,
+                        fill_values: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
         """Preprocess data for training"""
         try:
-            # Handle missing values
-            data = data.fillna(data.mean(numeric_only=True))
-            data = data.fillna(data.mode().iloc[0])
+            # Handle missing values: numeric mean, categorical mode, in one pass
+            stats = ColumnStatistics(numeric_strategy='mean')
+            if fill_values is None:
+                stats.fit(data)
+            else:
+                stats.fill_values = dict(fill_values)
+            self.fill_values = stats.fill_values
+            data = stats.transform(data.copy(deep=False))
             
             # Separate features and target
             X = data.drop(columns=[target_column])
             y = data[target_column]
             
             # Encode categorical variables
-            categorical_columns = X.select_dtypes(include=['object']).columns
+            categorical_columns = X.select_dtypes(include=['object', 'category']).columns
             for col in categorical_columns:
-                le = LabelEncoder()
+                # Hashing needs no vocabulary, for high-cardinality IDs
+                le = HashingEncoder(self.hash_buckets) if self.categorical_encoding == 'hash' else LabelEncoder()
                 X[col] = le.fit_transform(X[col])
+                self.feature_encoders[col] = le
+            
+            # Fill values in model input space, so inference can impute without recomputing
+            self.feature_columns = list(X.columns)
+            self.feature_fill = np.array([
+                self.feature_encoders[col].transform([self.fill_values[col]])[0]
+                if col in self.feature_encoders else self.fill_values.get(col, np.nan)
+                for col in self.feature_columns
+            ], dtype=np.float64)
             
             # Scale features
             X_scaled = self.scaler.fit_transform(X)
             
             # Encode target if it's categorical
-            if y.dtype == 'object':
+            if y.dtype == 'object' or isinstance(y.dtype, pd.CategoricalDtype):
                 y_encoded = self.label_encoder.fit_transform(y)
             else:
                 y_encoded = y.values
@@ -75,78 +124,254 @@ class ModelTrainer:
             logger.error(f"Error in preprocessing: {e}")
             raise
     
-    def train_models(self, X_train: np.ndarray, y_train: np.ndarray, 
-                    X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, Any]:
-        """Train multiple models and select the best one"""
-        models = {
-            'random_forest': RandomForestClassifier(n_estimators=100, random_state=42),
-            'gradient_boosting': GradientBoostingClassifier(random_state=42),
-            'logistic_regression': LogisticRegression(random_state=42, max_iter=1000)
+    def transform_data(self, data: pd.DataFrame, target_column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Preprocess new data with the already fitted transformers
+        
+        Nothing is refitted, so the result lives in the same feature space
+        as the data the current model was trained on. Unseen categories of a
+        label-encoded feature are imputed like missing values; unseen target
+        labels are an error.
+        """
+        stats = ColumnStatistics()
+        stats.fill_values = dict(self.fill_values)
+        data = stats.transform(data.copy(deep=False))
+        
+        X = data[self.feature_columns].copy()
+        y = data[target_column]
+        for col, encoder in self.feature_encoders.items():
+            values = X[col].astype(object)
+            if not isinstance(encoder, HashingEncoder):
+                unseen = ~values.isin(encoder.classes_)
+                if unseen.any():
+                    logger.warning(f"{int(unseen.sum())} unseen value(s) in {col}, imputed")
+                    values = values.mask(unseen, self.fill_values[col])
+            X[col] = encoder.transform(values)
+        X_scaled = self.scaler.transform(X)
+        
+        if hasattr(self.label_encoder, 'classes_') and (
+                y.dtype == 'object' or isinstance(y.dtype, pd.CategoricalDtype)):
+            unseen = sorted(set(y.astype(object)) - set(self.label_encoder.classes_))
+            if unseen:
+                raise ValueError(f"Unseen target labels {unseen[:10]}; retrain from scratch")
+            y_encoded = self.label_encoder.transform(y)
+        else:
+            y_encoded = y.values
+        return X_scaled, y_encoded
+    
+    @staticmethod
+    def _is_parallel(model: Any) -> bool:
+        # Forests fit their trees on n_jobs cores; boosting and linear models use one
+        return isinstance(model, BaseEnsemble) and 'n_jobs' in model.get_params()
+    
+    def _allocate_cores(self, models: Dict[str, Any], n_jobs: int) -> Dict[str, int]:
+        """Give single-threaded estimators one core each and the rest to parallel ensembles"""
+        parallel = [name for name, model in models.items() if self._is_parallel(model)]
+        spare = max(n_jobs - (len(models) - len(parallel)), len(parallel), 1)
+        cores = {name: 1 for name in models}
+        for i, name in enumerate(parallel):
+            cores[name] = spare // len(parallel) + (1 if i < spare % len(parallel) else 0)
+        return cores
+    
+    def candidate_models(self, params: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Unfitted candidate models, with per-family parameter overrides (e.g. from a search)"""
+        params = params or {}
+        return {
+            'random_forest': RandomForestClassifier(
+                **{'n_estimators': 100, 'random_state': 42, **params.get('random_forest', {})}),
+            'gradient_boosting': GradientBoostingClassifier(
+                **{'random_state': 42, **params.get('gradient_boosting', {})}),
+            'logistic_regression': LogisticRegression(
+                **{'random_state': 42, 'max_iter': 1000, **params.get('logistic_regression', {})})
         }
+    
+    def _preprocessing_state(self) -> Dict[str, Any]:
+        """Fitted transformers produced by preprocess_data"""
+        return {
+            'scaler': self.scaler,
+            'label_encoder': self.label_encoder,
+            'feature_encoders': self.feature_encoders,
+            'fill_values': self.fill_values,
+            'feature_columns': self.feature_columns,
+            'feature_fill': self.feature_fill
+        }
+    
+    def _restore_preprocessing_state(self, state: Dict[str, Any]):
+        for name, value in state.items():
+            setattr(self, name, value)
+    
+    def load_preprocessed(self, data_filename: str, target_column: str,
+                          sample_size: Optional[int] = None,
+                          use_cache: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Load and preprocess a data file, reusing cached arrays when possible
         
-        results = {}
+        The cache key covers the file content and every preprocessing
+        parameter, so a changed file or setting is parsed afresh. Cached X/y
+        come back memory-mapped read-only.
+        """
+        filepath = os.path.join(self.data_path, data_filename)
+        key = None
+        if use_cache:
+            with self.profiler.stage('cache_lookup'):
+                key = self.cache.key(filepath, {
+                    'target_column': target_column,
+                    'sample_size': sample_size,
+                    'categorical_encoding': self.categorical_encoding,
+                    'hash_buckets': self.hash_buckets
+                })
+                cached = self.cache.get(key)
+            if cached is not None:
+                X, y, state = cached
+                self._restore_preprocessing_state(state)
+                logger.info(f"Loaded preprocessed data for {filepath} from cache ({X.shape[0]} rows)")
+                return X, y
+        
+        with self.profiler.stage('load_data'):
+            fill_values = None
+            if sample_size is not None:
+                # Fill values come from every row, gathered in the same streaming pass
+                stats = ColumnStatistics(numeric_strategy='mean')
+                data = self.load_data(data_filename, sample_size=sample_size, on_chunk=stats.partial_fit)
+                fill_values = stats.fill_values
+            else:
+                data = self.load_data(data_filename)
+        
+        with self.profiler.stage('preprocess_data'):
+            X, y = self.preprocess_data(data, target_column, fill_values)
+        if key is not None:
+            with self.profiler.stage('cache_store'):
+                self.cache.put(key, X, y, self._preprocessing_state())
+        return X, y
+    
+    def train_models(self, X_train: np.ndarray, y_train: np.ndarray, 
+                    X_test: np.ndarray, y_test: np.ndarray,
+                    n_jobs: Optional[int] = None,
+                    models: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Train multiple models concurrently and select the best one
         
+        Each candidate is fitted in its own worker process. The data is
+        written once as .npy files and memory-mapped read-only by every
+        worker. n_jobs defaults to the host's CPU count; 1 trains in-process.
+        models defaults to candidate_models().
+        """
+        if models is None:
+            models = self.candidate_models()
+        
+        n_jobs = n_jobs or os.cpu_count() or 1
+        cores = self._allocate_cores(models, n_jobs)
         for name, model in models.items():
-            try:
+            if self._is_parallel(model):
+                model.set_params(n_jobs=cores[name])
+        
+        outcomes = {}
+        if n_jobs == 1:
+            arrays = (X_train, y_train, X_test, y_test)
+            for name, model in models.items():
                 logger.info(f"Training {name}...")
-                model.fit(X_train, y_train)
-                
-                # Make predictions
-                y_pred = model.predict(X_test)
-                
-                # Calculate metrics
-                accuracy = accuracy_score(y_test, y_pred)
-                report = classification_report(y_test, y_pred, output_dict=True)
-                
-                results[name] = {
-                    'model': model,
-                    'accuracy': accuracy,
-                    'classification_report': report
-                }
-                
-                logger.info(f"{name} accuracy: {accuracy:.4f}")
+                outcomes[name] = _fit_and_evaluate(name, model, arrays)
+        else:
+            with tempfile.TemporaryDirectory(prefix='train_') as tmp:
+                paths = share_arrays(tmp, (X_train, y_train, X_test, y_test))
                 
-                # Update best model
-                if accuracy > self.best_score:
-                    self.best_score = accuracy
-                    self.best_model = model
-                    self.model = model
-                    
-            except Exception as e:
-                logger.error(f"Error training {name}: {e}")
+                workers = min(len(models), n_jobs)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {}
+                    for name, model in models.items():
+                        logger.info(f"Training {name} on {cores[name]} core(s)...")
+                        futures[name] = executor.submit(_fit_and_evaluate, name, model, paths)
+                    for name, future in futures.items():
+                        try:
+                            outcomes[name] = future.result()
+                        except Exception as e:
+                            outcomes[name] = e
+        
+        results = {}
+        
+        # Select in declaration order so ties resolve as in sequential training
+        for name in models:
+            outcome = outcomes[name]
+            if isinstance(outcome, Exception):
+                logger.error(f"Error training {name}: {outcome}")
                 continue
+            
+            model, accuracy, report, profile = outcome
+            seconds = profile['fit']['wall_seconds']
+            for stage, stats in profile.items():
+                self.profiler.record(f"{stage}:{name}", stats)
+            if self._is_parallel(model):
+                # Serving predicts a few rows at a time; threads would only add overhead
+                model.set_params(n_jobs=None)
+            results[name] = {
+                'model': model,
+                'accuracy': accuracy,
+                'classification_report': report,
+                'fit_seconds': seconds,
+                'profile': profile
+            }
+            
+            logger.info(f"{name} accuracy: {accuracy:.4f} ({seconds:.1f}s)")
+            
+            # Update best model
+            if accuracy > self.best_score:
+                self.best_score = accuracy
+                self.best_model = model
+                self.best_model_name = name
+                self.model = model
         
         return results
     
-    def save_model(self, model_name: str = "best_model") -> str:
-        """Save the trained model and preprocessing objects"""
+    def save_model(self, model_name: str = "best_model", compress: int = 0) -> str:
+        """
+        Save the trained model and preprocessing objects
+        
+        Writes an artifact directory with one file per component and a
+        manifest (see model_artifacts.save_artifact); compress is the zlib
+        level for the component files.
+        """
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            model_filename = f"{model_name}_{timestamp}.pkl"
+            model_filename = f"{model_name}_{timestamp}{ARTIFACT_SUFFIX}"
             model_filepath = os.path.join(self.model_path, model_filename)
+            # Never replace an existing artifact (e.g. the parent of an incremental update)
+            suffix = 1
+            while os.path.exists(model_filepath):
+                model_filename = f"{model_name}_{timestamp}_{suffix}{ARTIFACT_SUFFIX}"
+                model_filepath = os.path.join(self.model_path, model_filename)
+                suffix += 1
             
             # Save model and preprocessing objects
             model_data = {
                 'model': self.model,
-                'scaler': self.scaler,
-                'label_encoder': self.label_encoder,
+                **self._preprocessing_state(),
                 'best_score': self.best_score,
-                'timestamp': timestamp
+                'timestamp': timestamp,
+                'lineage': self.lineage
             }
             
-            joblib.dump(model_data, model_filepath)
-            logger.info(f"Model saved to {model_filepath}")
+            manifest = save_artifact(model_data, model_filepath, compress=compress)
+            sizes = ", ".join(f"{name} {info['bytes'] / 1024:.1f} KB"
+                              for name, info in manifest['components'].items())
+            logger.info(f"Model saved to {model_filepath} ({manifest['total_bytes'] / 2**20:.2f} MB: {sizes})")
             
             # Save model metadata
             metadata = {
+                'name': model_name,
                 'model_file': model_filename,
                 'accuracy': self.best_score,
-                'timestamp': timestamp
+                'timestamp': timestamp,
+                'artifact_bytes': manifest['total_bytes'],
+                'lineage': self.lineage
             }
+            if self.search_results is not None:
+                metadata['search'] = dict(
+                    self.search_results,
+                    selected_model=self.best_model_name,
+                    selected_params=self.search_results['best_params'].get(self.best_model_name)
+                )
             
-            metadata_filepath = os.path.join(self.model_path, "model_metadata.json")
-            with open(metadata_filepath, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self._write_metadata(model_name, metadata)
             
             return model_filepath
             
@@ -154,53 +379,346 @@ class ModelTrainer:
             logger.error(f"Error saving model: {e}")
             raise
     
+    def _write_metadata(self, model_name: str, metadata: Dict[str, Any]):
+        """Make metadata the entry for model_name (and the top-level, latest model) in model_metadata.json"""
+        # Keep an entry per model name so several models can be served
+        metadata_filepath = os.path.join(self.model_path, "model_metadata.json")
+        models = {}
+        if os.path.exists(metadata_filepath):
+            with open(metadata_filepath) as f:
+                previous = json.load(f)
+            models = previous.get('models', {})
+        metadata = {key: value for key, value in metadata.items() if key != 'models'}
+        models[model_name] = dict(metadata)
+        metadata['models'] = models
+        
+        # Write atomically so readers never see a partial file
+        tmp_filepath = f"{metadata_filepath}.tmp"
+        with open(tmp_filepath, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_filepath, metadata_filepath)
+    
+    def _record_profile(self, model_name: str, profile: Dict[str, Any]):
+        """Attach a pipeline profile to model_name's metadata entry"""
+        metadata_filepath = os.path.join(self.model_path, "model_metadata.json")
+        with open(metadata_filepath) as f:
+            metadata = json.load(f)['models'][model_name]
+        metadata['profile'] = profile
+        self._write_metadata(model_name, metadata)
+    
     def load_model(self, model_filepath: str) -> bool:
         """Load a trained model"""
         try:
-            model_data = joblib.load(model_filepath)
+            # Artifact directories load component by component; legacy pickles are mapped read-only
+            model_data = load_artifact(model_filepath)
             self.model = model_data['model']
             self.scaler = model_data['scaler']
             self.label_encoder = model_data['label_encoder']
+            self.feature_encoders = model_data.get('feature_encoders', {})
+            self.feature_columns = model_data.get('feature_columns', [])
+            self.fill_values = model_data.get('fill_values', {})
+            self.feature_fill = model_data.get('feature_fill')
             self.best_score = model_data['best_score']
+            self.lineage = list(model_data.get('lineage', []))
             logger.info(f"Model loaded from {model_filepath}")
             return True
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             return False
     
-    def train_pipeline(self, data_filename: str, target_column: str, 
-                      test_size: float = 0.2) -> Dict[str, Any]:
-        """Complete training pipeline"""
+    def search_hyperparameters(self, X_train: np.ndarray, y_train: np.ndarray, budget_seconds: float,
+                               budget_type: str = "wall", n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Search each candidate family's hyperparameters within a time budget
+        
+        Uses successive halving over growing subsets of the training rows
+        (see SuccessiveHalvingSearch). The outcome, including the trace of
+        every trial, is kept in search_results and saved to the metadata.
+        
+        Returns:
+            dict: Family -> best parameters found
+        """
+        search = SuccessiveHalvingSearch(
+            budget_seconds, budget_type=budget_type, n_jobs=n_jobs or os.cpu_count() or 1
+        )
+        best_params = search.search(self.candidate_models(), X_train, y_train)
+        self.search_results = {
+            'budget_seconds': budget_seconds,
+            'budget_type': budget_type,
+            'best_params': best_params,
+            'validation_scores': search.best_scores,
+            'trace': search.trace
+        }
+        return best_params
+    
+    def _lineage_entry(self, mode: str, data_filename: str, rows: int, **details) -> Dict[str, Any]:
+        """One step of a model's data lineage: the file (by content hash) it was trained on"""
+        return {
+            'mode': mode,
+            'data_file': data_filename,
+            'data_sha256': self.cache.file_digest(os.path.join(self.data_path, data_filename)),
+            'rows': int(rows),
+            'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+            **details
+        }
+    
+    def _latest_model_file(self, model_name: str) -> str:
+        metadata_filepath = os.path.join(self.model_path, "model_metadata.json")
+        with open(metadata_filepath) as f:
+            metadata = json.load(f)
+        entry = metadata.get('models', {}).get(model_name, metadata)
+        return os.path.join(self.model_path, entry['model_file'])
+    
+    @staticmethod
+    def _is_additive(model: Any) -> bool:
+        """Whether _update_model adds to what the model learned rather than refitting it"""
+        return hasattr(model, 'partial_fit') or isinstance(model, (BaseEnsemble, GradientBoostingClassifier))
+    
+    @staticmethod
+    def _update_model(model: Any, X: np.ndarray, y: np.ndarray, new_estimators: int) -> Tuple[Any, Dict[str, Any]]:
+        """
+        A copy of a fitted model, updated with (X, y) only
+        
+        Forests and boosting models keep their estimators and grow
+        new_estimators more, fitted on the new rows (boosting fits them to
+        the current ensemble's residuals). Estimators with partial_fit take
+        one more pass; others with warm_start are refitted on the new rows
+        starting from their current coefficients.
+        """
+        model = copy.deepcopy(model)
+        if hasattr(model, 'partial_fit'):
+            model.partial_fit(X, y, classes=model.classes_)
+            return model, {'method': 'partial_fit'}
+        if 'warm_start' not in model.get_params():
+            raise ValueError(f"{type(model).__name__} can't be updated incrementally; retrain from scratch")
+        
+        # Warm-started fits re-derive the classes from y, which must match the existing estimators
+        classes = np.unique(y)
+        if not np.array_equal(classes, model.classes_):
+            raise ValueError(f"New data has classes {classes.tolist()}, the model "
+                             f"{model.classes_.tolist()}; retrain from scratch")
+        details = {'method': 'warm_start'}
+        params = {'warm_start': True}
+        if isinstance(model, (BaseEnsemble, GradientBoostingClassifier)):
+            params['n_estimators'] = model.n_estimators + new_estimators
+            details['estimators_added'] = new_estimators
+        model.set_params(**params)
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+        return model, details
+    
+    def train_incremental(self, data_filename: str, target_column: str,
+                          base_model_path: Optional[str] = None,
+                          model_name: str = "best_model",
+                          new_estimators: int = 20,
+                          validation_size: float = 0.2,
+                          max_regression: float = 0.01,
+                          reference_filename: Optional[str] = None,
+                          reference_rows: Optional[int] = 10000) -> Dict[str, Any]:
+        """
+        Update the saved model with a new increment of data only
+        
+        Loads base_model_path (by default the latest model_name artifact),
+        preprocesses the increment with its fitted transformers and updates
+        the model (see _update_model). The base and updated models are both
+        scored on a held-out validation_size share of the increment; unless
+        the update loses more than max_regression accuracy it is saved as a
+        new artifact, with this increment appended to its lineage in the
+        metadata. Otherwise the base model stays in place.
+        
+        The increment alone can't show what the update forgets; pass
+        reference_filename (held-out data from earlier increments, sampled
+        down to reference_rows) to also guard accuracy on it. It is required
+        for models that can only be warm-started: those are refitted on the
+        increment alone, which always looks better on the increment.
+        
+        Returns:
+            dict: 'accepted', increment accuracies before and after, all
+            'validation' scores, 'model_path' (the new artifact, or the base
+            one if rejected), 'lineage' and 'profile'
+        """
+        self.profiler = StageProfiler()
         try:
-            # Load data
-            data = self.load_data(data_filename)
-            
-            # Preprocess data
-            X, y = self.preprocess_data(data, target_column)
+            with self.profiler.stage('pipeline'):
+                with self.profiler.stage('load_model'):
+                    base_model_path = base_model_path or self._latest_model_file(model_name)
+                    if not self.load_model(base_model_path):
+                        raise ValueError(f"Could not load base model {base_model_path}")
+                    base_model = self.model
+                    if not reference_filename and not self._is_additive(base_model):
+                        raise ValueError(
+                            f"{type(base_model).__name__} is refitted on the increment alone; "
+                            f"pass reference_filename to check it against earlier data"
+                        )
+                
+                with self.profiler.stage('load_data'):
+                    data = self.load_data(data_filename)
+                with self.profiler.stage('preprocess_data'):
+                    X, y = self.transform_data(data, target_column)
+                
+                with self.profiler.stage('split'):
+                    X_train, X_val, y_train, y_val = train_test_split(
+                        X, y, test_size=validation_size, random_state=42, stratify=y
+                    )
+                
+                with self.profiler.stage('update_model'):
+                    model, details = self._update_model(base_model, X_train, y_train, new_estimators)
+                
+                with self.profiler.stage('validate'):
+                    validation = {'increment': (X_val, y_val)}
+                    if reference_filename:
+                        reference = self.load_data(reference_filename, sample_size=reference_rows)
+                        validation['reference'] = self.transform_data(reference, target_column)
+                    scores = {}
+                    for name, (X_check, y_check) in validation.items():
+                        scores[name] = {
+                            'base_accuracy': accuracy_score(y_check, base_model.predict(X_check)),
+                            'accuracy': accuracy_score(y_check, model.predict(X_check))
+                        }
+                        logger.info(f"Incremental update on {len(y_train)} rows: {name} accuracy "
+                                    f"{scores[name]['base_accuracy']:.4f} -> {scores[name]['accuracy']:.4f}")
+                regressed = [name for name, score in scores.items()
+                             if score['accuracy'] < score['base_accuracy'] - max_regression]
+                accepted = not regressed
+                base_accuracy = scores['increment']['base_accuracy']
+                accuracy = scores['increment']['accuracy']
+                
+                model_path = base_model_path
+                if accepted:
+                    self.lineage.append(self._lineage_entry(
+                        'incremental', data_filename, len(y),
+                        parent_model_file=os.path.basename(base_model_path),
+                        reference_file=reference_filename, validation=scores, **details
+                    ))
+                    self.model = self.best_model = model
+                    self.best_score = accuracy
+                    with self.profiler.stage('save_model'):
+                        model_path = self.save_model(model_name)
+                else:
+                    logger.warning(f"Rejected incremental update: {', '.join(regressed)} accuracy "
+                                   f"dropped by more than {max_regression}, keeping {base_model_path}")
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=test_size, random_state=42, stratify=y
-            )
+            profile = {'stages': self.profiler.to_dict()}
+            if accepted:
+                self._record_profile(model_name, profile)
+            self.profiler.log_summary()
             
-            logger.info(f"Training set size: {X_train.shape[0]}")
-            logger.info(f"Test set size: {X_test.shape[0]}")
+            return {
+                'accepted': accepted,
+                'base_accuracy': base_accuracy,
+                'accuracy': accuracy,
+                'validation': scores,
+                'model_path': model_path,
+                'lineage': self.lineage,
+                'profile': profile
+            }
+        
+        except Exception as e:
+            logger.error(f"Error in incremental training: {e}")
+            raise
+    
+    def train_pipeline(self, data_filename: str, target_column: str, 
+                      test_size: float = 0.2, sample_size: Optional[int] = None,
+                      search_budget: Optional[float] = None,
+                      search_budget_type: str = "wall",
+                      use_cache: bool = True,
+                      profile_path: Optional[str] = None,
+                      model_name: str = "best_model") -> Dict[str, Any]:
+        """
+        Complete training pipeline
+        
+        The best model is saved under model_name, the name the ml-service
+        endpoints look it up by (e.g. "credit_model" or "risk_model").
+        With search_budget (seconds of wall-clock or CPU time, per
+        search_budget_type) the candidates' hyperparameters are searched
+        first and the final models are trained with the best ones found.
+        use_cache=False always re-parses and re-preprocesses the file.
+        
+        Wall time, CPU time and peak memory of every stage and of each
+        model's fit/predict are written to the model's metadata under
+        "profile". With profile_path, a cProfile dump of the run is written
+        there too (worker processes are not included).
+        """
+        self.profiler = StageProfiler()
+        cprofile = cProfile.Profile() if profile_path else None
+        if cprofile is not None:
+            cprofile.enable()
+        try:
+            with self.profiler.stage('pipeline'):
+                # Load and preprocess data (a streamed uniform sample for files
+                # larger than memory), or reuse the cached result for this file
+                X, y = self.load_preprocessed(data_filename, target_column, sample_size, use_cache)
+                self.lineage = [self._lineage_entry('full', data_filename, len(y))]
+                
+                # Split data
+                with self.profiler.stage('split'):
+                    X_train, X_test, y_train, y_test = train_test_split(
+                        X, y, test_size=test_size, random_state=42, stratify=y
+                    )
+                
+                logger.info(f"Training set size: {X_train.shape[0]}")
+                logger.info(f"Test set size: {X_test.shape[0]}")
+                
+                # Search hyperparameters within the budget, then train models
+                params = None
+                if search_budget:
+                    with self.profiler.stage('hyperparameter_search'):
+                        params = self.search_hyperparameters(X_train, y_train, search_budget, search_budget_type)
+                with self.profiler.stage('train_models'):
+                    results = self.train_models(X_train, y_train, X_test, y_test,
+                                                models=self.candidate_models(params))
+                
+                # Save best model
+                with self.profiler.stage('save_model'):
+                    model_path = self.save_model(model_name)
             
-            # Train models
-            results = self.train_models(X_train, y_train, X_test, y_test)
+            if cprofile is not None:
+                cprofile.disable()
+                cprofile.dump_stats(profile_path)
             
-            # Save best model
-            model_path = self.save_model()
+            profile = {'stages': self.profiler.to_dict(), 'cprofile_path': profile_path}
+            self._record_profile(model_name, profile)
+            self.profiler.log_summary()
             
             return {
                 'results': results,
                 'model_path': model_path,
-                'best_score': self.best_score
+                'best_score': self.best_score,
+                'profile': profile
             }
             
         except Exception as e:
             logger.error(f"Error in training pipeline: {e}")
             raise
+        finally:
+            if cprofile is not None:
+                cprofile.disable()
+
+def _fit_and_evaluate(name: str, model: Any, arrays) -> Any:
+    """
+    Fit and score one candidate model (runs in a worker process)
+    
+    arrays are either the (X_train, y_train, X_test, y_test) arrays or
+    paths to .npy files holding them, which are memory-mapped read-only.
+    Errors are returned rather than raised so one model can't fail the rest.
+    """
+    try:
+        X_train, y_train, X_test, y_test = load_arrays(arrays)
+        profiler = StageProfiler()
+        
+        with profiler.stage('fit'):
+            model.fit(X_train, y_train)
+        
+        with profiler.stage('predict'):
+            # Make predictions
+            y_pred = model.predict(X_test)
+            
+            # Calculate metrics
+            accuracy = accuracy_score(y_test, y_pred)
+            report = classification_report(y_test, y_pred, output_dict=True)
+        return model, accuracy, report, profiler.to_dict()
+    except Exception as e:
+        return e
 
 def main():
     """Main training function"""
@@ -5,8 +5,10 @@ import logging
 from datetime import datetime
 import hashlib
 import re
+import numpy as np
 from anonymization import PrivacyEngine as AdvancedPrivacyEngine
 from differential_privacy import DifferentialPrivacy
+from budget_ledger import PrivacyBudgetLedger
 from encryption import EncryptionManager
 from tokenizer import TokenizationService
 
@@ -201,10 +203,6 @@ def method_not_allowed(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
-if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
-
 # --- Advanced Anonymization Endpoint ---
 advanced_privacy_engine = AdvancedPrivacyEngine()
 
@@ -231,7 +229,11 @@ def advanced_anonymize():
         return jsonify({'error': 'Internal server error'}), 500
 
 # --- Differential Privacy Endpoint ---
-dp_engine = DifferentialPrivacy()
+budget_ledger = PrivacyBudgetLedger(
+    path=os.environ.get('DP_LEDGER_PATH', 'privacy_budget.sqlite'),
+    default_budget=float(os.environ.get('DP_DEFAULT_BUDGET', 10.0)),
+    flush_interval=float(os.environ.get('DP_LEDGER_FLUSH_INTERVAL', 1.0))
+)
 
 @app.route('/differential-privacy', methods=['POST'])
 def differential_privacy():
@@ -240,12 +242,26 @@ def differential_privacy():
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-        values = data.get('values')
-        sensitivity = data.get('sensitivity', 1.0)
-        epsilon = data.get('epsilon', 1.0)
-        dp_engine.epsilon = epsilon
+        dataset_id = str(data.get('dataset_id', 'default'))
+        # Validate everything before charging, so a bad request never spends budget
+        try:
+            values = np.asarray(data.get('values'), dtype=float)
+            sensitivity = float(data.get('sensitivity', 1.0))
+            epsilon = float(data.get('epsilon', 1.0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'values, sensitivity and epsilon must be numeric'}), 400
+        if not np.isfinite(epsilon) or epsilon <= 0:
+            return jsonify({'error': 'Epsilon must be positive'}), 400
+        if not np.isfinite(sensitivity) or sensitivity < 0:
+            return jsonify({'error': 'Sensitivity must be non-negative'}), 400
+        try:
+            remaining = budget_ledger.charge(dataset_id, epsilon)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 403
+        # Engine per request so concurrent calls never share epsilon
+        dp_engine = DifferentialPrivacy(epsilon=epsilon)
         noisy = dp_engine.laplace_mechanism(values, sensitivity)
-        return jsonify({'success': True, 'noisy': noisy})
+        return jsonify({'success': True, 'noisy': noisy.tolist(), 'remaining_budget': remaining})
     except Exception as e:
         logger.error(f"Differential privacy error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -296,4 +312,19 @@ def tokenize_data():
         return jsonify({'success': True, 'token': token})
     except Exception as e:
         logger.error(f"Tokenization error: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Internal server error'}), 500
+
+def after_fork():
+    """
+    Set up a pre-fork server worker (see gunicorn.conf.py)
+
+    The engines built in the parent are shared copy-on-write. Workers must
+    not draw the same noise, so the inherited NumPy RNG state is reseeded,
+    and the budget ledger switches to the store shared by all workers.
+    """
+    np.random.seed()
+    budget_ledger.after_fork()
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
@@ -0,0 +1,294 @@
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+class _BudgetAccount:
+    """In-memory budget state for a single dataset or tenant."""
+
+    __slots__ = ('total', 'spent', 'reserved', 'lock')
+
+    def __init__(self, total: float, spent: float = 0.0):
+        self.total = total
+        self.spent = spent
+        self.reserved = 0.0
+        self.lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return self.total - self.spent - self.reserved
+
+class PrivacyBudgetLedger:
+    """
+    Thread-safe privacy budget ledger keyed by dataset or tenant.
+
+    Every key has its own lock, so charges against different datasets never
+    contend with each other. Charges are applied in memory and persisted to a
+    local SQLite store by a background thread in batches, keeping the hot
+    path to a lock acquisition and a few float operations.
+
+    In forked server workers (after after_fork()) balances and reservations
+    live in the store instead, so every worker sees every charge and every
+    reservation: each change is one SQLite write transaction on the calling
+    thread's own connection, and reads are plain queries. A reservation
+    held by a worker that dies is only cleared when the ledger is next
+    opened.
+    """
+
+    def __init__(self, path: str = 'privacy_budget.sqlite',
+                 default_budget: float = 10.0,
+                 flush_interval: float = 1.0):
+        """
+        Initialize the ledger and load persisted balances.
+
+        Args:
+            path: SQLite file used to persist spent budget
+            default_budget: Total epsilon granted to keys seen for the first time
+            flush_interval: Seconds between batched writes to the store
+        """
+        self.path = path
+        self.default_budget = default_budget
+        self.flush_interval = flush_interval
+
+        self._accounts: Dict[str, _BudgetAccount] = {}
+        self._accounts_lock = threading.Lock()
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._shared = False
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS privacy_budget ('
+            'key TEXT PRIMARY KEY, total REAL NOT NULL, spent REAL NOT NULL, '
+            'reserved REAL NOT NULL DEFAULT 0)'
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(privacy_budget)')]
+        if 'reserved' not in columns:
+            self._conn.execute('ALTER TABLE privacy_budget ADD COLUMN reserved REAL NOT NULL DEFAULT 0')
+        # Reservations belong to processes of an earlier run, which are gone
+        self._conn.execute('UPDATE privacy_budget SET reserved = 0')
+        self._conn.commit()
+        for key, total, spent in self._conn.execute('SELECT key, total, spent FROM privacy_budget'):
+            self._accounts[key] = _BudgetAccount(total, spent)
+
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _account(self, key: str) -> _BudgetAccount:
+        account = self._accounts.get(key)
+        if account is None:
+            # Only account creation takes the global lock
+            with self._accounts_lock:
+                account = self._accounts.setdefault(key, _BudgetAccount(self.default_budget))
+        return account
+
+    def _mark_dirty(self, key: str):
+        if self._shared:
+            return
+        with self._dirty_lock:
+            self._dirty.add(key)
+
+    def _connection(self) -> sqlite3.Connection:
+        """The calling thread's connection to the shared store"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit, so transactions are only the explicit BEGINs below
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _refresh(conn: sqlite3.Connection, key: str, account: _BudgetAccount):
+        row = conn.execute(
+            'SELECT total, spent, reserved FROM privacy_budget WHERE key = ?', (key,)
+        ).fetchone()
+        if row is not None:
+            account.total, account.spent, account.reserved = row
+
+    @contextmanager
+    def _locked(self, key: str, write: bool = True):
+        """
+        Lock key's account for a read or update.
+
+        Shared across processes, the account is first refreshed from the
+        store. Updates run in a write transaction, which SQLite serializes
+        across workers, and are committed on exit; reads need none.
+        """
+        account = self._account(key)
+        with account.lock:
+            if not self._shared:
+                yield account
+                return
+            conn = self._connection()
+            if not write:
+                self._refresh(conn, key, account)
+                yield account
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._refresh(conn, key, account)
+                yield account
+                conn.execute(
+                    'INSERT INTO privacy_budget (key, total, spent, reserved) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET total = excluded.total, spent = excluded.spent, '
+                    'reserved = excluded.reserved',
+                    (key, account.total, account.spent, account.reserved)
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def after_fork(self):
+        """
+        Reinitialize in a forked worker process.
+
+        SQLite connections and threads don't survive fork, and workers
+        keeping their own balances or reservations could together overspend
+        a budget, so from here on every change goes straight to the shared
+        store.
+        """
+        self._accounts_lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        for account in self._accounts.values():
+            account.lock = threading.Lock()
+        # Unflushed changes stay with the parent, which writes them
+        self._dirty = set()
+        self._shared = True
+        # The inherited connection belongs to the parent; closing it here could
+        # disturb the parent's locks, so it is kept but never used. Each
+        # thread opens its own, so threads don't share one transaction.
+        self._parent_conn = self._conn
+        self._local = threading.local()
+        # WAL lets reads proceed while another worker writes
+        self._connection().execute('PRAGMA journal_mode=WAL')
+
+    def set_budget(self, key: str, total: float):
+        """
+        Set the total budget available for a key.
+
+        Args:
+            key: Dataset or tenant identifier
+            total: Total epsilon available
+        """
+        with self._locked(key) as account:
+            account.total = total
+        self._mark_dirty(key)
+
+    def charge(self, key: str, amount: float) -> float:
+        """
+        Atomically charge budget for a query.
+
+        Args:
+            key: Dataset or tenant identifier
+            amount: Epsilon consumed by the query
+
+        Returns:
+            Remaining budget after the charge
+        """
+        if amount <= 0:
+            raise ValueError("Budget amount must be positive")
+
+        with self._locked(key) as account:
+            if amount > account.remaining():
+                raise ValueError("Insufficient privacy budget")
+            account.spent += amount
+            remaining = account.remaining()
+        self._mark_dirty(key)
+        return remaining
+
+    def reserve(self, key: str, amount: float) -> float:
+        """
+        Reserve budget before running a query.
+
+        The reservation must later be settled with commit() or released
+        with release(); until then it counts against the remaining budget.
+
+        Args:
+            key: Dataset or tenant identifier
+            amount: Epsilon to hold back
+
+        Returns:
+            Remaining budget after the reservation
+        """
+        if amount <= 0:
+            raise ValueError("Budget amount must be positive")
+
+        with self._locked(key) as account:
+            if amount > account.remaining():
+                raise ValueError("Insufficient privacy budget")
+            account.reserved += amount
+            return account.remaining()
+
+    @staticmethod
+    def _settle(account: _BudgetAccount, amount: float):
+        # Tolerate float rounding left over from earlier settlements
+        if amount <= 0 or amount > account.reserved + 1e-9:
+            raise ValueError("Amount was not reserved")
+        account.reserved = max(account.reserved - amount, 0.0)
+
+    def commit(self, key: str, amount: float):
+        """Convert a reservation into spent budget."""
+        with self._locked(key) as account:
+            # The total may have been lowered since the reservation was made
+            if account.spent + amount > account.total + 1e-9:
+                raise ValueError("Insufficient privacy budget")
+            self._settle(account, amount)
+            account.spent += amount
+        self._mark_dirty(key)
+
+    def release(self, key: str, amount: float):
+        """Return a reservation to the available budget."""
+        with self._locked(key) as account:
+            self._settle(account, amount)
+
+    def get_remaining_budget(self, key: str) -> float:
+        """Get the remaining budget for a key."""
+        with self._locked(key, write=False) as account:
+            return account.remaining()
+
+    def reset(self, key: str):
+        """Reset the spent budget for a key."""
+        with self._locked(key) as account:
+            account.spent = 0.0
+        self._mark_dirty(key)
+
+    def flush(self):
+        """Write all pending balance changes to the store in one transaction."""
+        with self._flush_lock:
+            with self._dirty_lock:
+                keys, self._dirty = self._dirty, set()
+            if not keys:
+                return
+
+            rows = []
+            for key in keys:
+                account = self._accounts[key]
+                with account.lock:
+                    rows.append((key, account.total, account.spent))
+
+            self._conn.executemany(
+                'INSERT INTO privacy_budget (key, total, spent) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET total = excluded.total, spent = excluded.spent',
+                rows
+            )
+            self._conn.commit()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error persisting privacy budget: {str(e)}")
+
+    def close(self):
+        """Stop the background writer and persist outstanding charges."""
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        self._conn.close()
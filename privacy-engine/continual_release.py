@@ -0,0 +1,184 @@
+import numpy as np
+from typing import Union, List, Sequence
+from differential_privacy import DifferentialPrivacy
+
+class ContinualHistogram:
+    """
+    Differentially private histogram over a stream of events.
+
+    Uses the binary-tree (dyadic interval) mechanism: every time step is
+    covered by at most one node per tree level, and each node is released
+    once through the Laplace mechanism. Prefix and range counts are sums of
+    at most O(log T) noisy nodes, so error grows only logarithmically with
+    the length of the stream and the whole stream costs a single epsilon.
+    """
+
+    def __init__(self, bin_edges: Sequence[float], horizon: int,
+                 epsilon: float = 1.0):
+        """
+        Initialize the streaming histogram.
+
+        Args:
+            bin_edges: Monotonically increasing bin edges (fixed for the stream)
+            horizon: Maximum number of time steps the stream will run for
+            epsilon: Privacy budget for the entire stream (event-level DP)
+        """
+        if horizon < 1:
+            raise ValueError("Horizon must be at least 1")
+
+        self.bin_edges = np.asarray(bin_edges, dtype=float)
+        if self.bin_edges.ndim != 1 or len(self.bin_edges) < 2:
+            raise ValueError("bin_edges must contain at least two edges")
+
+        self.n_bins = len(self.bin_edges) - 1
+        self.horizon = int(horizon)
+        self.epsilon = epsilon
+
+        # Each event lands in one node per level, so the budget is split evenly
+        self.levels = int(np.floor(np.log2(self.horizon))) + 1
+        self._dp = DifferentialPrivacy(epsilon=epsilon / self.levels)
+
+        # Exact sums of the still-open node on each level
+        self._partial = np.zeros((self.levels, self.n_bins))
+        # Released noisy nodes; level j node i covers steps [i * 2^j, (i + 1) * 2^j)
+        self._nodes: List[List[np.ndarray]] = [[] for _ in range(self.levels)]
+        self.t = 0
+
+    @property
+    def noise_scale(self) -> float:
+        """Laplace scale of each released tree node."""
+        return 1.0 / self._dp.epsilon
+
+    def update(self, counts: Union[Sequence[float], np.ndarray]):
+        """
+        Close the current time step with the given per-bin counts.
+
+        Args:
+            counts: Number of events per bin observed during this time step
+        """
+        if self.t >= self.horizon:
+            raise ValueError("Stream horizon exceeded")
+
+        counts = np.asarray(counts, dtype=float).reshape(self.n_bins)
+        self._partial += counts
+        self.t += 1
+
+        # Nodes on level j close every 2^j steps; higher levels close less often
+        for level in range(self.levels):
+            if self.t % (1 << level):
+                break
+            noisy = self._dp.laplace_mechanism(self._partial[level], sensitivity=1.0)
+            self._nodes[level].append(noisy)
+            self._partial[level] = 0.0
+
+    def ingest(self, values: Union[Sequence[float], np.ndarray]):
+        """
+        Bin a batch of raw event values and close the current time step.
+
+        Args:
+            values: Event values observed during this time step
+        """
+        counts, _ = np.histogram(np.asarray(values, dtype=float), bins=self.bin_edges)
+        self.update(counts)
+
+    def range_count(self, start: int, end: int) -> np.ndarray:
+        """
+        Return noisy per-bin counts for time steps in [start, end).
+
+        Args:
+            start: First time step (inclusive)
+            end: Last time step (exclusive), at most the current time
+
+        Returns:
+            Noisy counts per bin
+        """
+        if not 0 <= start <= end <= self.t:
+            raise ValueError(f"Range [{start}, {end}) outside released steps [0, {self.t})")
+
+        total = np.zeros(self.n_bins)
+        # Greedy dyadic decomposition: at most two nodes per level
+        while start < end:
+            level = self.levels - 1
+            while start % (1 << level) or start + (1 << level) > end:
+                level -= 1
+            total += self._nodes[level][start >> level]
+            start += 1 << level
+        return total
+
+    def prefix_count(self, t: int = None) -> np.ndarray:
+        """
+        Return noisy per-bin counts over the first t time steps.
+
+        Args:
+            t: Number of steps (defaults to all released steps)
+
+        Returns:
+            Noisy counts per bin
+        """
+        return self.range_count(0, self.t if t is None else t)
+
+    def error_std(self, start: int, end: int) -> float:
+        """Standard deviation of the noise in range_count(start, end) per bin."""
+        nodes = 0
+        while start < end:
+            level = self.levels - 1
+            while start % (1 << level) or start + (1 << level) > end:
+                level -= 1
+            nodes += 1
+            start += 1 << level
+        return float(np.sqrt(2 * nodes) * self.noise_scale)
+
+class ContinualCounter(ContinualHistogram):
+    """Differentially private running count of events (single-bin histogram)."""
+
+    def __init__(self, horizon: int, epsilon: float = 1.0):
+        """
+        Initialize the streaming counter.
+
+        Args:
+            horizon: Maximum number of time steps the stream will run for
+            epsilon: Privacy budget for the entire stream (event-level DP)
+        """
+        super().__init__([-np.inf, np.inf], horizon, epsilon)
+
+    def update(self, count: float):
+        """
+        Close the current time step with the given event count.
+
+        Args:
+            count: Number of events observed during this time step
+        """
+        super().update([count])
+
+    def ingest(self, events: Union[Sequence, np.ndarray]):
+        """
+        Count a batch of events and close the current time step.
+
+        Args:
+            events: Events observed during this time step
+        """
+        self.update(len(events))
+
+    def range_count(self, start: int, end: int) -> float:
+        """Return the noisy event count for time steps in [start, end)."""
+        return float(super().range_count(start, end)[0])
+
+# Example usage and testing
+if __name__ == "__main__":
+    np.random.seed(42)
+
+    counter = ContinualCounter(horizon=1024, epsilon=1.0)
+    true_total = 0
+    for _ in range(1000):
+        batch = np.random.poisson(20)
+        true_total += batch
+        counter.update(batch)
+
+    print("True count:", true_total)
+    print("Private count:", counter.prefix_count())
+    print("Noise std:", counter.error_std(0, counter.t))
+
+    histogram = ContinualHistogram(bin_edges=[0, 0.25, 0.5, 0.75, 1.0], horizon=256)
+    for _ in range(100):
+        histogram.ingest(np.random.random(50))
+    print("\nPrivate histogram (steps 10-90):", histogram.range_count(10, 90))
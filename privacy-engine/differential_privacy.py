@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
-from typing import Union, List, Optional, Callable
+from typing import Union, List, Dict, Optional, Callable
 import warnings
+import time
 
 class DifferentialPrivacy:
     """
@@ -111,7 +112,94 @@ class DifferentialPrivacy:
                 raise ValueError("Mechanism must be 'laplace' or 'gaussian'")
         
         return df_noisy
-    
+
+    def add_noise_to_columns(self, df: pd.DataFrame,
+                             columns: List[str],
+                             sensitivities: Union[float, List[float], Dict[str, float]] = None,
+                             mechanism: str = 'laplace',
+                             inplace: bool = False,
+                             dtype: type = np.float64,
+                             return_stats: bool = False):
+        """
+        Add differential privacy noise to many numeric columns in one pass.
+
+        The columns are extracted as a single 2-D float block and noise for
+        every cell is drawn in one vectorized call with per-column scales.
+
+        Args:
+            df: Input DataFrame
+            columns: List of column names to add noise to
+            sensitivities: Fixed sensitivity for all columns, a list aligned
+                with ``columns``, or a dict keyed by column name (defaults to
+                each column's range)
+            mechanism: Type of mechanism ('laplace' or 'gaussian')
+            inplace: Write the noisy columns back into ``df`` instead of a copy
+            dtype: Float dtype of the noisy columns (e.g. np.float32)
+            return_stats: Also return the rows, columns and throughput of the call
+
+        Returns:
+            DataFrame with noisy columns, or a (DataFrame, stats) tuple
+            when return_stats is set
+        """
+        if mechanism not in ('laplace', 'gaussian'):
+            raise ValueError("Mechanism must be 'laplace' or 'gaussian'")
+
+        if sensitivities is not None and not isinstance(sensitivities, dict) and np.ndim(sensitivities) > 0:
+            if len(sensitivities) != len(columns):
+                raise ValueError("sensitivities must have one value per column")
+            # Pair with the requested columns before any of them are skipped
+            sensitivities = dict(zip(columns, sensitivities))
+
+        start = time.perf_counter()
+
+        noisy_columns = []
+        for col in columns:
+            if col not in df.columns:
+                warnings.warn(f"Column '{col}' not found in DataFrame")
+            elif not pd.api.types.is_numeric_dtype(df[col]):
+                warnings.warn(f"Column '{col}' is not numeric, skipping")
+            else:
+                noisy_columns.append(col)
+
+        result = df if inplace else df.copy(deep=False)
+        block = df[noisy_columns].to_numpy(dtype=dtype, copy=True)
+        if block.size == 0:
+            stats = {'rows': block.shape[0], 'columns': block.shape[1],
+                     'seconds': 0.0, 'cells_per_second': 0.0}
+            return (result, stats) if return_stats else result
+
+        if sensitivities is None:
+            sensitivity = np.nanmax(block, axis=0) - np.nanmin(block, axis=0)
+        elif isinstance(sensitivities, dict):
+            sensitivity = np.array([sensitivities[col] for col in noisy_columns], dtype=float)
+        else:
+            sensitivity = np.full(len(noisy_columns), float(sensitivities))
+
+        # Seed from the global RNG so np.random.seed() keeps runs reproducible
+        rng = np.random.default_rng(np.random.randint(2**31 - 1))
+        if mechanism == 'laplace':
+            scale = sensitivity / self.epsilon
+            # Laplace(0, 1) is the difference of two standard exponentials,
+            # which can be drawn directly in the requested dtype
+            noise = rng.standard_exponential(block.shape, dtype=dtype)
+            noise -= rng.standard_exponential(block.shape, dtype=dtype)
+        else:
+            scale = sensitivity * np.sqrt(2 * np.log(1.25 / self.delta)) / self.epsilon
+            noise = rng.standard_normal(block.shape, dtype=dtype)
+        noise *= scale.astype(dtype)
+        block += noise
+
+        result[noisy_columns] = block
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'rows': block.shape[0],
+            'columns': block.shape[1],
+            'seconds': elapsed,
+            'cells_per_second': block.size / elapsed if elapsed > 0 else float('inf')
+        }
+        return (result, stats) if return_stats else result
+
     def private_count(self, data: Union[pd.Series, np.ndarray, List]) -> float:
         """
         Return differentially private count.
@@ -256,6 +344,11 @@ if __name__ == "__main__":
     print("\nOriginal salary mean:", df['salary'].mean())
     print("Noisy salary mean:", df_noisy['salary'].mean())
     
+    # Test vectorized multi-column noise addition
+    df_noisy, stats = dp.add_noise_to_columns(df, ['salary', 'age'], sensitivities={'salary': 100.0, 'age': 45.0},
+                                              return_stats=True)
+    print("Vectorized noise throughput (cells/s):", stats['cells_per_second'])
+    
     # Test histogram
     noisy_counts, bin_edges = dp.private_histogram(data)
     print("\nHistogram bins:", len(bin_edges) - 1)
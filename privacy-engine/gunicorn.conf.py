@@ -0,0 +1,53 @@
+"""
+Production server settings: gunicorn workers forked from a preloaded app
+
+    gunicorn -c gunicorn.conf.py tokenizer:app
+    gunicorn -c gunicorn.conf.py app:app
+
+The app module is imported once in the master, so the anonymization and
+tokenization engines are built before the workers fork and shared with them
+copy-on-write. Each worker then calls the module's after_fork() to reseed
+its RNG and reopen shared state such as the privacy budget ledger. SIGHUP
+reloads gracefully: the workers are replaced once they finish their
+requests (the master calls the module's reload_models() first, if any).
+
+Tuned with environment variables: PORT, WEB_CONCURRENCY (workers, default
+one per CPU), GUNICORN_THREADS (per worker), GUNICORN_TIMEOUT,
+GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE, GUNICORN_MAX_REQUESTS and
+GUNICORN_ACCESS_LOG (a path or "-" for stdout).
+"""
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Recycled workers fork from the master again, so they start with the shared models
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+preload_app = True
+# Worker heartbeats on tmpfs, so a slow container disk can't stall them
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+def _service(server):
+    return sys.modules.get(server.app.app_uri.split(':')[0])
+
+def pre_fork(server, worker):
+    # Keep the garbage collector from writing to (and so copying) the shared objects
+    gc.freeze()
+
+def post_fork(server, worker):
+    hook = getattr(_service(server), 'after_fork', None)
+    if hook is not None:
+        hook()
+
+def on_reload(server):
+    hook = getattr(_service(server), 'reload_models', None)
+    if hook is not None:
+        server.log.info("Reloading models before replacing workers")
+        hook()
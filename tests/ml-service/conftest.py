@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service modules are flat scripts, imported by name like the app does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'ml-service'))
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from forest_scorer import CompiledIsolationForest
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 5))
+    X[:30] += 6
+    return X[:500], X[500:]
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'max_features': 0.6},
+    {'max_features': 2, 'bootstrap': True},
+    {'max_samples': 64},
+])
+def test_scores_match_sklearn(data, params):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=25, random_state=0, **params).fit(X_train)
+    scorer = CompiledIsolationForest(model)
+
+    np.testing.assert_allclose(scorer.score_samples(X_test), model.score_samples(X_test), rtol=1e-10)
+    assert scorer.offset_ == model.offset_
+    np.testing.assert_array_equal(scorer.decision_function(X_test) < 0, model.predict(X_test) == -1)
+
+def test_single_sample_fit_matches_sklearn(data):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=5, random_state=0).fit(X_train[:1])
+    scorer = CompiledIsolationForest(model)
+
+    np.testing.assert_allclose(scorer.score_samples(X_test), model.score_samples(X_test))
+
+def test_more_rows_than_a_chunk(data):
+    X_train, _ = data
+    model = IsolationForest(n_estimators=10, random_state=0).fit(X_train)
+    X = np.random.default_rng(1).normal(size=(CompiledIsolationForest.CHUNK_ROWS * 2 + 3, 5))
+
+    np.testing.assert_allclose(CompiledIsolationForest(model).score_samples(X), model.score_samples(X))
+
+def test_save_and_load_mapped(data, tmp_path):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=10, random_state=0).fit(X_train)
+    scorer = CompiledIsolationForest(model)
+    path = str(tmp_path / 'forest')
+    scorer.save(path)
+
+    loaded = CompiledIsolationForest.load(path)
+    assert isinstance(loaded.threshold, np.memmap)
+    np.testing.assert_array_equal(loaded.score_samples(X_test), scorer.score_samples(X_test))
+    with pytest.raises(FileExistsError):
+        scorer.save(path)
@@ -0,0 +1,68 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.linear_model import LogisticRegression
+
+from hyperparameter_search import SuccessiveHalvingSearch
+
+class SlowClassifier(ClassifierMixin, BaseEstimator):
+    """Predicts the majority class after sleeping for `delay` seconds in fit"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def fit(self, X, y):
+        time.sleep(self.delay)
+        self.classes_, counts = np.unique(y, return_counts=True)
+        self.majority_ = self.classes_[np.argmax(counts)]
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.majority_)
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 3))
+    return X, (X[:, 0] > 0).astype(int)
+
+def test_search_stops_at_the_budget(data):
+    delays = [0.2 + i / 1000 for i in range(9)]
+    search = SuccessiveHalvingSearch(0.5, search_spaces={'slow': {'delay': delays}}, min_samples=50)
+
+    start = time.perf_counter()
+    best = search.search({'slow': SlowClassifier()}, *data)
+
+    # The trial running when the budget runs out is the only overshoot
+    assert time.perf_counter() - start < 0.5 + 0.5
+    assert 0 < len(search.trace) < len(delays)
+    # No rung was completed, so the best finished trial is returned
+    assert best['slow']['delay'] in delays
+
+def test_search_kills_trials_running_past_the_budget(data):
+    search = SuccessiveHalvingSearch(
+        0.5, search_spaces={'slow': {'delay': [30.0, 31.0]}}, n_configs=2, min_samples=50, n_jobs=2
+    )
+
+    start = time.perf_counter()
+    best = search.search({'slow': SlowClassifier()}, *data)
+
+    assert time.perf_counter() - start < 10
+    assert best == {}
+    assert search.trace == []
+    assert multiprocessing.active_children() == []
+
+def test_unlimited_budget_completes_every_rung(data):
+    search = SuccessiveHalvingSearch(
+        60, search_spaces={'logistic_regression': {'C': [0.01, 0.1, 1.0, 10.0, 100.0]}},
+        n_configs=5, eta=2, min_samples=50
+    )
+    best = search.search({'logistic_regression': LogisticRegression()}, *data)
+
+    last_rung = max(trial['rung'] for trial in search.trace)
+    final = [t for t in search.trace if t['rung'] == last_rung]
+    assert best['logistic_regression'] == max(final, key=lambda t: t['score'])['params']
+    assert final[0]['n_samples'] == max(t['n_samples'] for t in search.trace)
@@ -0,0 +1,84 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from model_artifacts import ModelArtifact, is_artifact, load_artifact, save_artifact
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    return X, y
+
+def _model_data(model, X, y):
+    return {
+        'model': model.fit(X, y),
+        'scaler': StandardScaler().fit(X),
+        'feature_columns': ['a', 'b', 'c', 'd'],
+        'best_score': 0.9
+    }
+
+@pytest.mark.parametrize('model', [
+    RandomForestClassifier(n_estimators=10, random_state=0),
+    GradientBoostingClassifier(n_estimators=10, random_state=0),
+    LogisticRegression(),
+])
+@pytest.mark.parametrize('compress', [0, 3])
+def test_round_trip_keeps_predictions(tmp_path, data, model, compress):
+    X, y = data
+    model_data = _model_data(model, X, y)
+    path = str(tmp_path / 'model.model')
+    save_artifact(model_data, path, compress=compress)
+
+    artifact = load_artifact(path)
+    assert isinstance(artifact, ModelArtifact)
+    np.testing.assert_array_equal(artifact['model'].predict_proba(X), model_data['model'].predict_proba(X))
+    np.testing.assert_array_equal(artifact['scaler'].transform(X), model_data['scaler'].transform(X))
+    assert artifact['feature_columns'] == model_data['feature_columns']
+    assert artifact['best_score'] == 0.9
+
+def test_components_load_lazily(tmp_path, data):
+    X, y = data
+    path = str(tmp_path / 'model.model')
+    save_artifact(_model_data(RandomForestClassifier(n_estimators=5, random_state=0), X, y), path)
+
+    artifact = load_artifact(path)
+    assert artifact['best_score'] == 0.9
+    assert artifact._loaded == {}
+    artifact['scaler']
+    assert set(artifact._loaded) == {'scaler'}
+
+def test_uncompressed_trees_are_separate_npy_files(tmp_path, data):
+    X, y = data
+    path = str(tmp_path / 'model.model')
+    manifest = save_artifact(_model_data(RandomForestClassifier(n_estimators=5, random_state=0), X, y), path)
+
+    files = manifest['components']['model']['files']
+    assert 'trees.npz' not in files
+    assert any(f.startswith('trees.') and f.endswith('.npy') for f in files)
+    assert all(os.path.isfile(os.path.join(path, f)) for f in files)
+
+def test_save_replaces_an_existing_artifact(tmp_path, data):
+    X, y = data
+    path = str(tmp_path / 'model.model')
+    save_artifact({'model': LogisticRegression().fit(X, y), 'best_score': 0.5}, path)
+    save_artifact({'model': LogisticRegression().fit(X, y), 'best_score': 0.7}, path)
+
+    assert load_artifact(path)['best_score'] == 0.7
+    assert not os.path.exists(f"{path}.tmp")
+
+def test_legacy_pickle_still_loads(tmp_path, data):
+    X, y = data
+    model_data = _model_data(LogisticRegression(), X, y)
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump(model_data, path)
+
+    assert not is_artifact(path)
+    loaded = load_artifact(path)
+    np.testing.assert_array_equal(loaded['model'].predict(X), model_data['model'].predict(X))
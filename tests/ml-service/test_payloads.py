@@ -0,0 +1,77 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from payloads import NPY_CONTENT_TYPE, PayloadError, parse_entity_ids, parse_features
+
+app = Flask(__name__)
+
+def _parse(schema=None, **request):
+    with app.test_request_context('/', method='POST', **request) as context:
+        return parse_features(context.request, schema)
+
+def _npy(array):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+def test_row_dicts_are_ordered_by_schema():
+    matrix, names, columnar = _parse(['b', 'a'], json={'features': [{'a': 1, 'b': 2}, {'a': 3, 'b': 4}]})
+
+    np.testing.assert_array_equal(matrix, [[2, 1], [4, 3]])
+    assert names == ['b', 'a']
+    assert not columnar
+
+def test_columns_and_positional_rows():
+    matrix, names, columnar = _parse(json={'features': {'a': [1, 2], 'b': [3, 4]}})
+    np.testing.assert_array_equal(matrix, [[1, 3], [2, 4]])
+    assert columnar
+
+    matrix, names, _ = _parse(json={'features': [[1, 2], [3, 4]]})
+    assert names == ['f0', 'f1']
+
+@pytest.mark.parametrize('body', [
+    None,
+    {},
+    {'features': 'abc'},
+    {'features': 5},
+    {'features': [[1, 2], [3]]},
+    {'features': [[1, 'x']]},
+    {'features': [[1, 2], {'a': 1}]},
+    {'features': {'a': [1, 2], 'b': [3]}},
+    {'features': {'a': [[1, 2]]}},
+    {'features': {'a': ['x']}},
+    {'features': [{'a': 'x'}]},
+])
+def test_malformed_json_is_a_payload_error(body):
+    with pytest.raises(PayloadError):
+        _parse(data=json.dumps(body), content_type='application/json')
+
+def test_schema_mismatch_is_a_payload_error():
+    with pytest.raises(PayloadError, match='do not match'):
+        _parse(['a', 'b'], json={'features': {'a': [1], 'c': [2]}})
+    with pytest.raises(PayloadError, match='expected 2'):
+        _parse(['a', 'b'], json={'features': [[1, 2, 3]]})
+
+def test_npy_bodies():
+    matrix, names, columnar = _parse(['a', 'b'], data=_npy([[1.0, 2.0]]), content_type=NPY_CONTENT_TYPE)
+    np.testing.assert_array_equal(matrix, [[1, 2]])
+    assert columnar
+
+    with pytest.raises(PayloadError, match='2-D'):
+        _parse(data=_npy([1.0, 2.0]), content_type=NPY_CONTENT_TYPE)
+    with pytest.raises(PayloadError):
+        _parse(data=b'not an npy file', content_type=NPY_CONTENT_TYPE)
+    with pytest.raises(PayloadError):
+        _parse(data=_npy([[1.0, 2.0]]), content_type=NPY_CONTENT_TYPE, headers={'X-Feature-Names': 'a'})
+
+@pytest.mark.parametrize('entity_ids', [{'a': 1}, 'u-1', [], [[1, 2]], [None], [True], [1.5]])
+def test_malformed_entity_ids(entity_ids):
+    with pytest.raises(PayloadError):
+        parse_entity_ids(entity_ids)
+
+def test_entity_ids():
+    assert parse_entity_ids(['u-1', 2]) == ['u-1', 2]
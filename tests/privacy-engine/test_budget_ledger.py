@@ -0,0 +1,67 @@
+import pytest
+
+from budget_ledger import PrivacyBudgetLedger
+
+@pytest.fixture
+def shared_ledgers(tmp_path):
+    """Two ledgers on one store, as two forked server workers see it"""
+    path = str(tmp_path / 'budget.sqlite')
+    ledgers = [PrivacyBudgetLedger(path, default_budget=10.0) for _ in range(2)]
+    for ledger in ledgers:
+        ledger.after_fork()
+    yield ledgers
+    for ledger in ledgers:
+        ledger._stop.set()
+
+def test_charge_is_persisted(tmp_path):
+    path = str(tmp_path / 'budget.sqlite')
+    ledger = PrivacyBudgetLedger(path, default_budget=10.0)
+    assert ledger.charge('d', 4.0) == 6.0
+    ledger.close()
+
+    assert PrivacyBudgetLedger(path).get_remaining_budget('d') == 6.0
+
+def test_shared_charges_cannot_overspend(shared_ledgers):
+    first, second = shared_ledgers
+    first.charge('d', 6.0)
+
+    with pytest.raises(ValueError, match='Insufficient'):
+        second.charge('d', 6.0)
+    assert second.get_remaining_budget('d') == 4.0
+
+def test_shared_reservations_cannot_overspend(shared_ledgers):
+    first, second = shared_ledgers
+    first.reserve('d', 10.0)
+
+    # The first worker's reservation holds the whole budget
+    with pytest.raises(ValueError, match='Insufficient'):
+        second.reserve('d', 10.0)
+    assert second.get_remaining_budget('d') == 0.0
+
+    first.commit('d', 10.0)
+    assert first.get_remaining_budget('d') == 0.0
+    assert second.get_remaining_budget('d') == 0.0
+
+def test_shared_release_returns_budget(shared_ledgers):
+    first, second = shared_ledgers
+    first.reserve('d', 4.0)
+    first.release('d', 4.0)
+
+    assert second.reserve('d', 10.0) == 0.0
+
+def test_commit_rechecks_a_lowered_total(shared_ledgers):
+    first, second = shared_ledgers
+    first.reserve('d', 8.0)
+    second.set_budget('d', 5.0)
+
+    with pytest.raises(ValueError, match='Insufficient'):
+        first.commit('d', 8.0)
+    first.release('d', 8.0)
+    assert first.get_remaining_budget('d') == 5.0
+
+def test_settling_more_than_reserved_fails(shared_ledgers):
+    first, _ = shared_ledgers
+    first.reserve('d', 2.0)
+
+    with pytest.raises(ValueError, match='not reserved'):
+        first.commit('d', 3.0)